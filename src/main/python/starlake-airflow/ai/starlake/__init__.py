@@ -1 +1,2 @@
 # package ai.starlake
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
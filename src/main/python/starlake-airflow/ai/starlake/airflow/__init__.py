@@ -1,5 +1,7 @@
-__all__ = ['starlake_airflow_job', 'starlake_airflow_options', 'starlake_airflow_orchestration']
+__all__ = ['starlake_airflow_job', 'starlake_airflow_options', 'starlake_airflow_orchestration', 'starlake_airflow_api', 'starlake_airflow_datasets']
 
 from .starlake_airflow_job import StarlakeAirflowJob, DEFAULT_DAG_ARGS, DEFAULT_POOL, AirflowDataset, StarlakeDatasetMixin
 from .starlake_airflow_options import StarlakeAirflowOptions
 from .starlake_airflow_orchestration import AirflowOrchestration
+from .starlake_airflow_api import AirflowApiClient, AirflowRunMonitor
+from .starlake_airflow_datasets import compact_dataset_uris
@@ -1,4 +1,4 @@
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from ai.starlake.dataset import StarlakeDataset
 
@@ -6,6 +6,10 @@ from ai.starlake.job import StarlakePreLoadStrategy, StarlakeSparkConfig, Starla
 
 from ai.starlake.airflow import StarlakeAirflowJob, StarlakeDatasetMixin
 
+from ai.starlake.common import sanitize_id
+
+from airflow.datasets import DatasetAlias
+
 from airflow.models.baseoperator import BaseOperator
 
 from airflow.operators.bash import BashOperator
@@ -39,10 +43,44 @@ class StarlakeAirflowBashJob(StarlakeAirflowJob):
         Returns:
             BaseOperator: The Airflow task.
         """
-        found = False
-
         env = self.sl_env_vars.copy() # Copy the current sl env variables
 
+        command = self.sl_command(arguments)
+        kwargs.update({'pool': kwargs.get('pool', self.pool)})
+
+        if kwargs.get('do_xcom_push', False):
+            return StarlakePythonOperator(
+                task_id=task_id,
+                dataset=dataset,
+                source=self.source,
+                python_callable=self.execute_command,
+                op_args=[command],
+                op_kwargs=kwargs,
+                provide_context=True,
+                **kwargs
+            )
+        else:
+            return StarlakeBashOperator(
+                task_id=task_id,
+                dataset=dataset,
+                source=self.source,
+                bash_command=command,
+                cwd=self.sl_root,
+                env=env,
+                **kwargs
+            )
+
+    def sl_command(self, arguments: list) -> str:
+        """Returns the starlake command to run with the given arguments, the sl env variables being added to its options.
+
+        Args:
+            arguments (list): The required arguments of the starlake command to run.
+
+        Returns:
+            str: The starlake command.
+        """
+        found = False
+
         for index, arg in enumerate(arguments):
             if arg == "--options" and arguments.__len__() > index + 1:
                 opts = arguments[index+1]
@@ -68,30 +106,59 @@ class StarlakeAirflowBashJob(StarlakeAirflowJob):
             arguments.append("--options")
             arguments.append(",".join([f"{key}={value}" for key, value in self.sl_env_vars.items()])) # Add/overwrite with sl env variables
 
-        command = __class__.get_context_var("SL_STARLAKE_PATH", "starlake", self.options) + f" {' '.join(arguments)}"
+        return __class__.get_context_var("SL_STARLAKE_PATH", "starlake", self.options) + f" {' '.join(arguments)}"
+
+    def sl_job_mapped(self, task_id: str, arguments: List[list], datasets: List[Union[StarlakeDataset, str]], **kwargs) -> Optional[BaseOperator]:
+        """Overrides StarlakeAirflowJob.sl_job_mapped()
+        Generate a single mapped Airflow task that will run the starlake command once per list of arguments, if dynamic task mapping is enabled.
+        The size of the dag does not depend anymore on the number of commands, each mapped task instance still emitting its own dataset.
+
+        Args:
+            task_id (str): The required task id.
+            arguments (List[list]): The required arguments of each starlake command to run.
+            datasets (List[Union[StarlakeDataset, str]]): The datasets to materialize, one per command.
+
+        Returns:
+            Optional[BaseOperator]: The mapped Airflow task, or None if dynamic task mapping is disabled.
+        """
+        if not self.dynamic_task_mapping:
+            return None
+
+        def dataset_template(dataset: Union[StarlakeDataset, str]) -> str:
+            if isinstance(dataset, StarlakeDataset):
+                cron = f"'{dataset.cron}'" if dataset.cron else "None"
+                return f"{{{{sl_window_dataset('{dataset.uri}', sl_window(ti, {cron}, data_interval_end | ts, 'current'), '{dataset.sl_schedule_parameter_name}', '{dataset.sl_schedule_format}')}}}}"
+            return dataset
+
+        commands = [self.sl_command(list(args)) for args in arguments]
         kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        params: dict = kwargs.get('params', dict())
+        # all the mapped task instances emit their dataset through the same alias
+        outlets = kwargs.get('outlets', [])
+        outlets.append(DatasetAlias(sanitize_id(params.get('uri', task_id)).lower()))
+        kwargs['outlets'] = outlets
 
         if kwargs.get('do_xcom_push', False):
-            return StarlakePythonOperator(
+            return StarlakePythonOperator.partial(
                 task_id=task_id,
-                dataset=dataset,
                 source=self.source,
                 python_callable=self.execute_command,
-                op_args=[command],
                 op_kwargs=kwargs,
                 provide_context=True,
                 **kwargs
-            )
+            ).expand_kwargs([
+                {'op_args': [command], 'dataset': dataset_template(dataset)} for command, dataset in zip(commands, datasets)
+            ])
         else:
-            return StarlakeBashOperator(
+            return StarlakeBashOperator.partial(
                 task_id=task_id,
-                dataset=dataset,
                 source=self.source,
-                bash_command=command,
                 cwd=self.sl_root,
-                env=env,
+                env=self.sl_env_vars.copy(),
                 **kwargs
-            )
+            ).expand_kwargs([
+                {'bash_command': command, 'dataset': dataset_template(dataset)} for command, dataset in zip(commands, datasets)
+            ])
 
 class StarlakePythonOperator(StarlakeDatasetMixin, PythonOperator):
     """Starlake Python Operator."""
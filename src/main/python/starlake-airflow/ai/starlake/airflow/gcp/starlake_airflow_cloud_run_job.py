@@ -2,9 +2,11 @@ import os
 
 from datetime import timedelta
 
+import asyncio
+
 import logging
 
-from typing import Any, Dict, Optional, Sequence, Union
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple, Union
 
 from ai.starlake.dataset import StarlakeDataset
 
@@ -20,12 +22,14 @@ from airflow.models.baseoperator import BaseOperator
 
 from airflow.operators.bash import BashOperator
 
-from airflow.providers.google.cloud.hooks.cloud_run import CloudRunHook
+from airflow.providers.google.cloud.hooks.cloud_run import CloudRunHook, CloudRunAsyncHook
 from airflow.providers.google.cloud.operators.cloud_run import  CloudRunExecuteJobOperator
 
 from airflow.sensors.base import BaseSensorOperator, PokeReturnValue
 from airflow.sensors.bash import BashSensor
 
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
 from airflow.utils.context import Context
 from airflow.utils.task_group import TaskGroup
 
@@ -51,6 +55,7 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
             cloud_run_async_poke_interval: float=None,
             retry_on_failure: bool=None,
             retry_delay_in_seconds: float=None,
+            cloud_run_deferrable: bool=None,
             separator:str = ' ',
             **kwargs):
         super().__init__(filename, module_name, pre_load_strategy=pre_load_strategy, options=options, **kwargs)
@@ -69,6 +74,7 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
         self.retry_on_failure = __class__.get_context_var("retry_on_failure", "False", self.options).lower() == 'true' if retry_on_failure is None else retry_on_failure
         self.retry_delay_in_seconds = float(__class__.get_context_var("retry_delay_in_seconds", "10", self.options)) if retry_delay_in_seconds is None else retry_delay_in_seconds
         self.use_gcloud = __class__.get_context_var("use_gcloud", "True", self.options).lower() == 'true'
+        self.cloud_run_deferrable = __class__.get_context_var("cloud_run_deferrable", "False", self.options).lower() == 'true' if cloud_run_deferrable is None else cloud_run_deferrable
 
     @classmethod
     def sl_execution_environment(self) -> Union[StarlakeExecutionEnvironment, str]:
@@ -111,18 +117,37 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
                     )
                     # check job completion
                     check_completion_id = task_id + '_check_completion'
-                    completion_sensor = GCloudRunJobCompletionSensor(
-                        task_id=check_completion_id,
-                        dataset=dataset if self.retry_on_failure else None,
-                        source=self.source,
-                        project_id=self.project_id,
-                        cloud_run_job_region=self.cloud_run_job_region,
-                        source_task_id=job_task.task_id,
-                        retry_on_failure=self.retry_on_failure,
-                        poke_interval=self.cloud_run_async_poke_interval,
-                        impersonate_service_account = self.impersonate_service_account,
-                        **kwargs
-                    )
+                    if self.cloud_run_deferrable:
+                        # wait for the completion of the execution within the triggerer
+                        sensor_kwargs = dict(kwargs)
+                        sensor_kwargs.update({'do_xcom_push': False})
+                        completion_sensor = CloudRunJobCompletionSensor(
+                            task_id=check_completion_id,
+                            dataset=dataset if self.retry_on_failure else None,
+                            source=self.source,
+                            source_task_id=job_task.task_id,
+                            job_name=self.cloud_run_job_name,
+                            project_id=self.project_id,
+                            region=self.cloud_run_job_region,
+                            impersonation_chain=self.cloud_run_service_account or None,
+                            deferrable=True,
+                            check_status=self.retry_on_failure,
+                            poke_interval=self.cloud_run_async_poke_interval,
+                            **sensor_kwargs
+                        )
+                    else:
+                        completion_sensor = GCloudRunJobCompletionSensor(
+                            task_id=check_completion_id,
+                            dataset=dataset if self.retry_on_failure else None,
+                            source=self.source,
+                            project_id=self.project_id,
+                            cloud_run_job_region=self.cloud_run_job_region,
+                            source_task_id=job_task.task_id,
+                            retry_on_failure=self.retry_on_failure,
+                            poke_interval=self.cloud_run_async_poke_interval,
+                            impersonate_service_account = self.impersonate_service_account,
+                            **kwargs
+                        )
                     if self.retry_on_failure:
                         job_task >> completion_sensor
                     else:
@@ -172,7 +197,7 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
                         region=self.cloud_run_job_region,
                         overrides=job_overrides,
                         mode=CloudRunMode.ASYNC,
-                        impersonation_chain=self.impersonate_service_account,
+                        impersonation_chain=self.cloud_run_service_account or None,
                         **kwargs
                     )
                     check_completion_id = task_id + '_check_completion'
@@ -181,7 +206,9 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
                         dataset=dataset,
                         source=self.source,
                         source_task_id=job_task.task_id,
-                        impersonation_chain=self.impersonate_service_account,
+                        impersonation_chain=self.cloud_run_service_account or None,
+                        deferrable=self.cloud_run_deferrable,
+                        poke_interval=self.cloud_run_async_poke_interval,
                         **kwargs
                     )
 
@@ -237,7 +264,7 @@ class StarlakeAirflowCloudRunJob(StarlakeAirflowJob):
                     region=self.cloud_run_job_region,
                     overrides=job_overrides,
                     mode=CloudRunMode.SYNC,
-                    impersonation_chain=self.impersonate_service_account,
+                    impersonation_chain=self.cloud_run_service_account or None,
                     **kwargs
                 )
 
@@ -359,7 +386,113 @@ class CloudRunJobOperator(StarlakeDatasetMixin, CloudRunExecuteJobOperator):
                 logger.exception(msg=f"Task {self.task_id} has failed")
                 return False
 
+class CloudRunJobCompletionTrigger(BaseTrigger):
+    """
+    This trigger waits within the triggerer for the completion of a cloud run job, either through the operation returned when the job was executed
+    or through the execution itself. All the triggers of the triggerer share the same asynchronous clients per connection.
+    When the status is not checked, a failed or cancelled job is reported as completed, its status being checked by another task.
+    """
+
+    _clients: Dict[Tuple[str, str, Optional[str]], Any] = dict()
+
+    def __init__(
+        self,
+        operation_name: Optional[str] = None,
+        execution_name: Optional[str] = None,
+        gcp_conn_id: str = "google_cloud_default",
+        impersonation_chain: Union[str, Sequence[str], None] = None,
+        poll_interval: float = 30,
+        timeout: Optional[float] = None,
+        check_status: bool = True,
+    ):
+        super().__init__()
+        if not operation_name and not execution_name:
+            raise ValueError("Either the operation name or the execution name must be provided")
+        self.operation_name = operation_name
+        self.execution_name = execution_name
+        self.gcp_conn_id = gcp_conn_id
+        self.impersonation_chain = impersonation_chain
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.check_status = check_status
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            f"{self.__class__.__module__}.{self.__class__.__name__}",
+            {
+                "operation_name": self.operation_name,
+                "execution_name": self.execution_name,
+                "gcp_conn_id": self.gcp_conn_id,
+                "impersonation_chain": self.impersonation_chain,
+                "poll_interval": self.poll_interval,
+                "timeout": self.timeout,
+                "check_status": self.check_status,
+            },
+        )
+
+    async def _client(self, kind: str) -> Any:
+        """Returns the asynchronous client of the given kind (jobs or executions) shared by the triggers using the same connection."""
+        impersonation_chain = self.impersonation_chain if isinstance(self.impersonation_chain, str) or self.impersonation_chain is None else ",".join(self.impersonation_chain)
+        key = (kind, self.gcp_conn_id, impersonation_chain)
+        client = __class__._clients.get(key, None)
+        if client is None:
+            hook = CloudRunAsyncHook(gcp_conn_id=self.gcp_conn_id, impersonation_chain=self.impersonation_chain)
+            if kind == "jobs":
+                client = hook.get_conn()
+                if asyncio.iscoroutine(client):
+                    client = await client
+            else:
+                from google.cloud.run_v2 import ExecutionsAsyncClient
+                from airflow.providers.google.common.consts import CLIENT_INFO
+                client = ExecutionsAsyncClient(credentials=hook.get_credentials(), client_info=CLIENT_INFO)
+            __class__._clients[key] = client
+        return client
+
+    async def _check(self) -> Optional[Dict[str, Any]]:
+        """Returns the event to fire if the job has completed, None otherwise."""
+        if self.operation_name:
+            client = await self._client("jobs")
+            operation: operations_pb2.Operation = await client.get_operation(operations_pb2.GetOperationRequest(name=self.operation_name))
+            if not operation.done:
+                return None
+            # An operation can only have one of those two combinations: if it is failed, then
+            # the error field will be populated, else, then the response field will be.
+            if operation.error.SerializeToString() and self.check_status:
+                return {"status": "error", "message": f"{operation.error.message} [{operation.error.code}]"}
+            return {"status": "success", "message": f"Operation {self.operation_name} completed"}
+        else:
+            execution: Execution = await (await self._client("executions")).get_execution(name=self.execution_name)
+            if not execution.completion_time:
+                return None
+            if (execution.failed_count or execution.cancelled_count) and self.check_status:
+                return {"status": "error", "message": f"Execution {self.execution_name} completed with {execution.failed_count} failed and {execution.cancelled_count} cancelled task(s)"}
+            return {"status": "success", "message": f"Execution {self.execution_name} completed"}
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+        while True:
+            try:
+                event = await self._check()
+            except Exception as e:
+                # transient errors are retried until the timeout
+                self.log.warning(f"Failed to check the completion of {self.operation_name or self.execution_name}: {e}")
+                event = None
+            if event:
+                yield TriggerEvent(event)
+                return
+            if deadline and loop.time() >= deadline:
+                yield TriggerEvent({"status": "timeout", "message": f"{self.operation_name or self.execution_name} did not complete within {self.timeout} seconds"})
+                return
+            await asyncio.sleep(self.poll_interval)
+
 class CloudRunJobCompletionSensor(StarlakeDatasetMixin, BaseSensorOperator):
+    """
+    This sensor checks the completion of a cloud run job, given either the operation pushed by the CloudRunJobOperator
+    or, when the job name is provided, the name of the execution pushed by the task which executed the job.
+    When deferrable, the sensor releases its worker slot and waits within the triggerer.
+    When check_status is False, the sensor only waits for the completion of the job, its status being checked by another task.
+    """
 
     template_fields = ("gcp_conn_id", "impersonation_chain")
 
@@ -370,26 +503,80 @@ class CloudRunJobCompletionSensor(StarlakeDatasetMixin, BaseSensorOperator):
         dataset: Optional[Union[StarlakeDataset, str]],
         source: Optional[str],
         source_task_id: str,
+        job_name: Optional[str] = None,
+        project_id: Optional[str] = None,
+        region: Optional[str] = None,
         gcp_conn_id: str = "google_cloud_default",
         impersonation_chain: Union[str, Sequence[str], None] = None,
+        deferrable: bool = False,
+        check_status: bool = True,
         **kwargs,
     ):
         super().__init__(
             task_id=task_id,
             dataset=dataset,
             source=source,
-            mode="reschedule", 
+            mode="poke" if deferrable else "reschedule", 
             **kwargs
         )
         self.source_task_id = source_task_id
+        self.job_name = job_name
+        self.project_id = project_id
+        self.region = region
         self.gcp_conn_id = gcp_conn_id
         self.impersonation_chain = impersonation_chain
+        self.deferrable = deferrable
+        self.check_status = check_status
+
+    def execution_name(self, context: Context) -> Optional[str]:
+        """Returns the fully qualified name of the execution to check, if the job name has been provided."""
+        if not self.job_name:
+            return None
+        execution = str(self.xcom_pull(context, task_ids=self.source_task_id)).strip()
+        return f"projects/{self.project_id}/locations/{self.region}/jobs/{self.job_name}/executions/{execution}"
+
+    def execute(self, context: Context) -> Any:
+        if not self.deferrable:
+            return super().execute(context)
+        execution_name = self.execution_name(context)
+        self.defer(
+            trigger=CloudRunJobCompletionTrigger(
+                operation_name=None if execution_name else self.xcom_pull(context, task_ids=self.source_task_id),
+                execution_name=execution_name,
+                gcp_conn_id=self.gcp_conn_id,
+                impersonation_chain=self.impersonation_chain,
+                poll_interval=self.poke_interval,
+                timeout=self.timeout,
+                check_status=self.check_status,
+            ),
+            method_name="execute_complete",
+        )
+
+    def execute_complete(self, context: Context, event: Dict[str, Any]) -> bool:
+        status = event.get("status", None)
+        message = event.get("message", "")
+        if status == "success":
+            self.log.info(message)
+            return True
+        if status == "error" and self.do_xcom_push:
+            self.log.error(message)
+            return False
+        raise AirflowException(message)
 
     def poke(self, context: Context):
         hook = CloudRunHook(
             gcp_conn_id=self.gcp_conn_id,
             impersonation_chain=self.impersonation_chain,
         )
+        execution_name = self.execution_name(context)
+        if execution_name:
+            from google.cloud.run_v2 import ExecutionsClient
+            execution: Execution = ExecutionsClient(credentials=hook.get_credentials()).get_execution(name=execution_name)
+            if not execution.completion_time:
+                return PokeReturnValue(False, False)
+            if (execution.failed_count or execution.cancelled_count) and self.check_status:
+                raise AirflowException(f"Execution {execution_name} completed with {execution.failed_count} failed and {execution.cancelled_count} cancelled task(s)")
+            return PokeReturnValue(True, True)
         operation_name = self.xcom_pull(context, task_ids=self.source_task_id)
         operation_request = operations_pb2.GetOperationRequest(name=operation_name)
         operation: operations_pb2.Operation = hook.get_conn().get_operation(
@@ -398,7 +585,7 @@ class CloudRunJobCompletionSensor(StarlakeDatasetMixin, BaseSensorOperator):
         if operation.done:
             # An operation can only have one of those two combinations: if it is failed, then
             # the error field will be populated, else, then the response field will be.
-            if operation.error.SerializeToString():
+            if operation.error.SerializeToString() and self.check_status:
                 if self.do_xcom_push:
                     self.log.error(
                         f"{operation.error.message} [{operation.error.code}]"
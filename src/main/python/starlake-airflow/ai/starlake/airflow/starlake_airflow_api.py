@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import threading
+
+from concurrent.futures import Future
+
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from urllib3.util.retry import Retry
+
+class AirflowApiClient:
+    """Client of the Airflow REST API, keeping its connections alive between calls
+    and retrying with an exponential backoff the calls which failed on a connection error, a 429 or a 5xx response.
+    """
+
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    _clients: Dict[Tuple[str, Optional[str]], AirflowApiClient] = dict()
+
+    _lock = threading.Lock()
+
+    def __init__(self, base_url: str, auth: Optional[Tuple[str, str]] = None, connect_timeout: float = 5.0, read_timeout: float = 30.0, retries: int = 5, backoff_factor: float = 0.5, pool_maxsize: int = 10) -> None:
+        """Initialize the client.
+        Args:
+            base_url (str): the base url of the Airflow webserver.
+            auth (Optional[Tuple[str, str]]): the optional username and password.
+            connect_timeout (float): the connect timeout in seconds. Defaults to 5.
+            read_timeout (float): the read timeout in seconds. Defaults to 30.
+            retries (int): the maximum number of retries. Defaults to 5.
+            backoff_factor (float): the backoff factor between retries, the n-th retry waiting backoff_factor * 2^(n-1) seconds. Defaults to 0.5.
+            pool_maxsize (int): the maximum number of connections kept alive. Defaults to 10.
+        """
+        self.api_base_url = f"{base_url.rstrip('/')}/api/v1"
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            # POST is retried since it is only used to list dag runs or to trigger a dag run with an explicit dag_run_id,
+            # a replayed trigger being then rejected with a 409 for that same id
+            allowed_methods=frozenset(['GET', 'POST', 'PATCH', 'DELETE']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.session.auth = auth
+
+    @classmethod
+    def shared(cls, **kwargs) -> AirflowApiClient:
+        """Returns the client shared by all the pipelines of the process for the same Airflow webserver and user.
+        Args:
+            AIRFLOW_BASE_URL (str): the base url of the Airflow webserver. Defaults to the AIRFLOW_BASE_URL environment variable or http://localhost:8080.
+            AIRFLOW_USERNAME (str): the optional username. Defaults to the AIRFLOW_USERNAME environment variable.
+            AIRFLOW_PASSWORD (str): the optional password. Defaults to the AIRFLOW_PASSWORD environment variable.
+            AIRFLOW_CONNECT_TIMEOUT (float): the connect timeout in seconds. Defaults to 5.
+            AIRFLOW_READ_TIMEOUT (float): the read timeout in seconds. Defaults to 30.
+            AIRFLOW_RETRIES (int): the maximum number of retries. Defaults to 5.
+        """
+        import os
+        env = os.environ.copy() # Copy the current environment variables
+        base_url = kwargs.get('AIRFLOW_BASE_URL', env.get('AIRFLOW_BASE_URL', "http://localhost:8080"))
+        username = kwargs.get('AIRFLOW_USERNAME', env.get('AIRFLOW_USERNAME', None))
+        password = kwargs.get('AIRFLOW_PASSWORD', env.get('AIRFLOW_PASSWORD', None))
+        auth = (username, password) if username and password else None
+        key = (base_url, username)
+        with cls._lock:
+            client = cls._clients.get(key, None)
+            if client is None:
+                client = cls(
+                    base_url,
+                    auth=auth,
+                    connect_timeout=float(kwargs.get('AIRFLOW_CONNECT_TIMEOUT', env.get('AIRFLOW_CONNECT_TIMEOUT', 5))),
+                    read_timeout=float(kwargs.get('AIRFLOW_READ_TIMEOUT', env.get('AIRFLOW_READ_TIMEOUT', 30))),
+                    retries=int(kwargs.get('AIRFLOW_RETRIES', env.get('AIRFLOW_RETRIES', 5))),
+                )
+                cls._clients[key] = client
+            return client
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request to the Airflow REST API.
+        Args:
+            method (str): the HTTP method.
+            path (str): the path relative to the api base url.
+        Returns:
+            requests.Response: the response.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, f"{self.api_base_url}/{path.lstrip('/')}", **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+class AirflowRunMonitor:
+    """Monitor many dag runs at once.
+    The state of all the outstanding dag runs is refreshed by a single batch call to the dagRuns list endpoint per poll,
+    the completion of each dag run being reported through its future.
+    """
+    def __init__(self, client: AirflowApiClient, timeout: Optional[float] = None, interval: float = 5.0, page_limit: int = 100, missing_polls: int = 3) -> None:
+        """Initialize the monitor.
+        Args:
+            client (AirflowApiClient): the Airflow REST API client.
+            timeout (Optional[float]): the optional global timeout in seconds for all the watched dag runs.
+            interval (float): the delay in seconds between two polls. Defaults to 5.
+            page_limit (int): the number of dag runs returned per page of the batch call. Defaults to 100.
+            missing_polls (int): the number of consecutive polls after which a pending dag run missing from the batch call is failed. Defaults to 3.
+        """
+        self.client = client
+        self.timeout = timeout
+        self.interval = interval
+        self.page_limit = page_limit
+        self.missing_polls = max(1, missing_polls)
+        self._watched: Dict[Tuple[str, str], Tuple[Future, Optional[str]]] = dict() # (dag id, dag run id) -> (future, logical date)
+        self._missing: Dict[Tuple[str, str], int] = dict() # (dag id, dag run id) -> number of consecutive polls without the dag run
+        self._lock = threading.Lock()
+
+    def watch(self, dag_id: str, dag_run_id: str, logical_date: Optional[str] = None) -> Future:
+        """Watch a dag run.
+        Args:
+            dag_id (str): the dag id.
+            dag_run_id (str): the dag run id.
+            logical_date (Optional[str]): the optional logical date of the dag run, used to narrow the batch call.
+        Returns:
+            Future: the future completed with the final state of the dag run, or failed if the dag run failed.
+        """
+        with self._lock:
+            key = (dag_id, dag_run_id)
+            if key not in self._watched:
+                self._watched[key] = (Future(), logical_date)
+            return self._watched[key][0]
+
+    @property
+    def pending(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [key for key, (future, _) in self._watched.items() if not future.done()]
+
+    def _list(self, pending: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Retrieve the state of the pending dag runs with the dagRuns list endpoint.
+        Returns:
+            Dict[Tuple[str, str], str]: the state by (dag id, dag run id) of the pending dag runs found.
+        """
+        with self._lock:
+            logical_dates = [self._watched[key][1] for key in pending]
+        body: dict = {
+            'dag_ids': sorted(set([dag_id for dag_id, _ in pending])),
+            'order_by': '-execution_date',
+            'page_limit': self.page_limit,
+        }
+        if all(logical_dates):
+            body['execution_date_gte'] = min(logical_dates)
+        keys = set(pending)
+        states = dict()
+        offset = 0
+        while keys - states.keys():
+            body['page_offset'] = offset
+            response = self.client.post("dags/~/dagRuns/list", json=body)
+            response.raise_for_status()
+            json_response: dict = response.json() or dict()
+            dag_runs = json_response.get('dag_runs', [])
+            for dag_run in dag_runs:
+                key = (dag_run.get('dag_id', None), dag_run.get('dag_run_id', None))
+                if key in keys:
+                    states[key] = dag_run.get('state', None)
+            offset += dag_runs.__len__()
+            if not dag_runs or offset >= int(json_response.get('total_entries', 0)):
+                break
+        return states
+
+    def poll(self) -> int:
+        """Refresh the state of all the pending dag runs and complete the futures of the finished ones.
+        Returns:
+            int: the number of dag runs still pending.
+        """
+        from airflow.utils.state import DagRunState
+        pending = self.pending
+        if not pending:
+            return 0
+        states = self._list(pending)
+        with self._lock:
+            futures = {key: self._watched[key][0] for key in pending}
+            missing = []
+            for key in pending:
+                if key in states:
+                    self._missing.pop(key, None)
+                else:
+                    self._missing[key] = self._missing.get(key, 0) + 1
+                    if self._missing[key] >= self.missing_polls:
+                        missing.append(key)
+        for (dag_id, dag_run_id), future in futures.items():
+            if future.done():
+                continue
+            state = states.get((dag_id, dag_run_id), None)
+            if state == DagRunState.SUCCESS:
+                print(f"Pipeline {dag_id} ({dag_run_id}) succeeded")
+                future.set_result(state)
+            elif state == DagRunState.FAILED:
+                print(f"Pipeline {dag_id} ({dag_run_id}) failed")
+                future.set_exception(Exception(f"Pipeline {dag_id} ({dag_run_id}) failed"))
+            elif (dag_id, dag_run_id) in missing:
+                print(f"Pipeline {dag_id} ({dag_run_id}) not found")
+                future.set_exception(Exception(f"Pipeline {dag_id} ({dag_run_id}) not found after {self.missing_polls} polls"))
+        remaining = self.pending
+        if remaining:
+            print(f"{remaining.__len__()} dag run(s) still running")
+        return remaining.__len__()
+
+    def wait(self) -> Dict[Tuple[str, str], Future]:
+        """Poll until all the watched dag runs complete or the global timeout expires, the futures of the dag runs still pending being then failed with a TimeoutError.
+        Returns:
+            Dict[Tuple[str, str], Future]: the future of each watched dag run by (dag id, dag run id).
+        """
+        import time
+        deadline = time.monotonic() + float(self.timeout) if self.timeout else None
+        while self.poll():
+            if deadline and time.monotonic() >= deadline:
+                with self._lock:
+                    futures = {key: self._watched[key][0] for key in self._watched.keys()}
+                for key, future in futures.items():
+                    if not future.done():
+                        future.set_exception(TimeoutError(f"Pipeline {key[0]} ({key[1]}) did not complete within {self.timeout} seconds"))
+                break
+            time.sleep(self.interval if not deadline else max(0.0, min(self.interval, deadline - time.monotonic())))
+        with self._lock:
+            return {key: future for key, (future, _) in self._watched.items()}
+
+    def start(self) -> threading.Thread:
+        """Poll in a background thread, the futures of the watched dag runs being completed asynchronously."""
+        thread = threading.Thread(target=self.wait, name="airflow-run-monitor", daemon=True)
+        thread.start()
+        return thread
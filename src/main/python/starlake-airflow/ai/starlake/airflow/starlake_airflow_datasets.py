@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+def compact_dataset_uris(parameter_names: Optional[List[str]] = None, orphaned_only: bool = True, dry_run: bool = False) -> Dict[str, int]:
+    """Compact the datasets published with one uri per schedule (i.e domain.table?sl_schedule=20240101T0000) into the stable uri of their sink.
+    The events of each compacted dataset are moved to the dataset of the stable uri, the parameters of its uri being added to their extra,
+    before the compacted dataset is deleted from the Airflow metadata database.
+    Args:
+        parameter_names (Optional[List[str]]): the schedule parameter names identifying the datasets to compact. Defaults to sl_schedule.
+        orphaned_only (bool): whether to compact only the datasets no longer referenced by any dag. Defaults to True.
+        dry_run (bool): whether to only report the datasets to compact. Defaults to False.
+    Returns:
+        Dict[str, int]: the number of datasets compacted by stable uri.
+    """
+    from urllib.parse import parse_qsl
+    from sqlalchemy import delete, select
+    from airflow.datasets.manager import dataset_manager
+    from airflow.models.dataset import DatasetEvent, DatasetModel
+    from airflow.utils.session import create_session
+
+    parameter_names = parameter_names or ['sl_schedule']
+    compacted: Dict[str, int] = dict()
+    with create_session() as session:
+        query = select(DatasetModel).where(DatasetModel.uri.like('%?%'))
+        if orphaned_only:
+            query = query.where(DatasetModel.is_orphaned.is_(True))
+        datasets_by_uri: Dict[str, list] = dict()
+        for dataset in session.scalars(query):
+            uri, _, query_string = dataset.uri.partition('?')
+            parameters = dict(parse_qsl(query_string))
+            if any(name in parameters for name in parameter_names):
+                datasets_by_uri.setdefault(uri, []).append((dataset.id, parameters))
+        for uri, datasets in datasets_by_uri.items():
+            compacted[uri] = datasets.__len__()
+            if dry_run:
+                print(f"{datasets.__len__()} dataset(s) to compact into {uri}")
+                continue
+            stable_dataset = session.scalar(select(DatasetModel).where(DatasetModel.uri == uri).limit(1))
+            if stable_dataset is None:
+                stable_dataset = DatasetModel(uri=uri)
+                dataset_manager.create_datasets(dataset_models=[stable_dataset], session=session)
+                session.flush()
+            for dataset_id, parameters in datasets:
+                for event in session.scalars(select(DatasetEvent).where(DatasetEvent.dataset_id == dataset_id)):
+                    event.dataset_id = stable_dataset.id
+                    event.extra = {**(event.extra or dict()), **parameters}
+            # the references of the compacted datasets are deleted in cascade
+            session.execute(
+                delete(DatasetModel).where(DatasetModel.id.in_([dataset_id for dataset_id, _ in datasets])).execution_options(synchronize_session=False)
+            )
+            print(f"{datasets.__len__()} dataset(s) compacted into {uri}")
+    return compacted
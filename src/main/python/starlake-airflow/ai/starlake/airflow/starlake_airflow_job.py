@@ -20,14 +20,16 @@ from airflow.models.baseoperator import BaseOperator
 
 from airflow.operators.empty import EmptyOperator
 
-from airflow.operators.python import ShortCircuitOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 
-from airflow.utils.task_group import TaskGroup
+from airflow.utils.task_group import TaskGroup, TaskGroupContext
 
 import logging
 
 DEFAULT_POOL:str ="default_pool"
 
+CRITICAL_PATH_VARIABLE: str = "sl_critical_path__{dag_id}"
+
 DEFAULT_DAG_ARGS = {
     'depends_on_past': False,
     'start_date': datetime(2023, 1, 1),
@@ -38,12 +40,36 @@ DEFAULT_DAG_ARGS = {
 }
 
 class AirflowDataset(AbstractEvent[Dataset]):
+    _stable_uri: Optional[bool] = None
+
+    @classmethod
+    def stable_uri(cls) -> bool:
+        """Whether the datasets are published with a single uri per sink, their schedule being carried by the extra of the events,
+        instead of one uri per schedule which adds a new dataset to the Airflow metadata database at each schedule.
+        The producers and the consumers of a dataset having to agree on its uri, it is set for the whole Airflow instance
+        by the SL_STABLE_DATASET_URI Airflow variable or environment variable. Defaults to False, since enabling it changes the uri
+        of all the datasets: every dag has to be regenerated and redeployed at once, the events of the former uris being moved
+        with compact_dataset_uris.
+        """
+        if AirflowDataset._stable_uri is None:
+            try:
+                stable_uri = StarlakeAirflowOptions.get_context_var(var_name='SL_STABLE_DATASET_URI')
+            except MissingEnvironmentVariable:
+                stable_uri = 'False'
+            AirflowDataset._stable_uri = str(stable_uri).lower() == 'true'
+        return AirflowDataset._stable_uri
+
     @classmethod
     def to_event(cls, dataset: StarlakeDataset, source: Optional[str] = None) -> Dataset:
         extra = {}
         if source:
             extra["source"] = source
-        return Dataset(dataset.refresh().url, extra)
+        dataset = dataset.refresh()
+        if cls.stable_uri():
+            if dataset.schedule:
+                extra[dataset.sl_schedule_parameter_name] = dataset.schedule
+            return Dataset(dataset.uri, extra)
+        return Dataset(dataset.url, extra)
 
 class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOptions, AirflowDataset):
     def __init__(self, filename: str, module_name: str, pre_load_strategy: Union[StarlakePreLoadStrategy, str, None], options: dict=None, **kwargs) -> None:
@@ -54,6 +80,10 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
         super().__init__(filename, module_name, pre_load_strategy=pre_load_strategy, options=options, **kwargs)
         self.pool = str(__class__.get_context_var(var_name='default_pool', default_value=DEFAULT_POOL, options=self.options))
+        self.dynamic_task_mapping = str(__class__.get_context_var(var_name='dynamic_task_mapping', default_value='False', options=self.options)).lower() == 'true'
+        self.resolve_windows = str(__class__.get_context_var(var_name='resolve_windows', default_value='False', options=self.options)).lower() == 'true'
+        self.critical_path_priority = str(__class__.get_context_var(var_name='critical_path_priority', default_value='False', options=self.options)).lower() == 'true'
+        self._critical_paths: dict = dict()
         self.outlets: List[Dataset] = kwargs.get('outlets', [])
         sd = __class__.get_context_var(var_name='start_date', default_value="2024-11-1", options=self.options)
         import re
@@ -92,11 +122,15 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
         kwargs.update({'doc': kwargs.get('doc', f'Import tables {",".join(list(tables or []))} within {domain}.')})
         kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
         return super().sl_import(task_id=task_id, domain=domain, tables=tables, **kwargs)
 
     def execute_command(self, command: str, **kwargs) -> int:
         """
         Execute the command and capture the return code.
+        The output of the command is forwarded line by line to the task logger through a bounded buffer,
+        only its last lines being kept for the failure message and pushed to XCom.
+        The command runs within its own process group, which is terminated if the timeout expires or if the task is interrupted.
 
         Args:
             command (str): The command to run.
@@ -107,35 +141,75 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
         env = self.sl_env(command)
 
-        import subprocess
+        import os, queue, signal, subprocess, threading, time
+        from collections import deque
+
+        timeout = float(__class__.get_context_var(var_name='sl_command_timeout', default_value='0', options=self.options))
+        tail = deque(maxlen=max(1, int(__class__.get_context_var(var_name='sl_command_output_tail', default_value='100', options=self.options))))
+        logger = logging.getLogger("airflow.task")
+        lines: queue.Queue = queue.Queue(maxsize=1000)
+        args = command.split(' ')
+
+        process = subprocess.Popen(
+            args=args,
+            env=env,
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+            start_new_session=True,
+        )
+
+        def read_output() -> None:
+            for line in iter(process.stdout.readline, b''):
+                lines.put(line.decode('utf-8', errors='replace').rstrip())
+            process.stdout.close()
+            lines.put(None)
+
+        def terminate(grace_period: float = 10.0) -> None:
+            if process.poll() is None:
+                try:
+                    os.killpg(process.pid, signal.SIGTERM)
+                    process.wait(timeout=grace_period)
+                except subprocess.TimeoutExpired:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+                except ProcessLookupError:
+                    pass
+
+        reader = threading.Thread(target=read_output, daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout if timeout > 0 else None
         try:
-            # Run the command and capture the return code
-            result = subprocess.run(
-                args=command.split(' '), 
-                env=env,
-                check=True, 
-                stderr=subprocess.STDOUT, 
-                stdout=subprocess.PIPE,
-            )
-            return_code = result.returncode
-            if result.stdout is not None:
-                print(result.stdout.decode('utf-8'))
-            # if result.stderr is not None:
-            #     stderr = result.stderr.decode('utf-8')
-            #     print(stderr)
-            return return_code
-        except subprocess.CalledProcessError as e:
-            # Capture the return code in case of failure
-            return_code = e.returncode
-            # Push the return code to XCom
-            kwargs['ti'].xcom_push(key='return_value', value=return_code)
-            output = e.output.decode('utf-8')
-            print(output)
-            # if e.stderr is not None:
-            #     stderr = e.stderr.decode('utf-8')
-            #     print(stderr)
-            # Re-raise the exception to mark the task as failed
-            raise 
+            while True:
+                try:
+                    line = lines.get(timeout=1.0)
+                except queue.Empty:
+                    line = ''
+                if line is None:
+                    break
+                elif line:
+                    logger.info(line)
+                    tail.append(line)
+                if deadline and time.monotonic() > deadline:
+                    logger.error(f"Command timed out after {timeout} seconds")
+                    terminate()
+                    raise subprocess.TimeoutExpired(args, timeout, output='\n'.join(tail))
+            return_code = process.wait()
+        except BaseException:
+            # propagate the interruption of the task (i.e on_kill or timeout) to the whole process group
+            terminate()
+            raise
+        finally:
+            reader.join(timeout=5)
+
+        if return_code != 0:
+            ti = kwargs.get('ti', None)
+            if ti:
+                # Push the return code and the tail of the output to XCom
+                ti.xcom_push(key='return_value', value=return_code)
+                ti.xcom_push(key='output_tail', value='\n'.join(tail))
+            # Raise an exception to mark the task as failed
+            raise subprocess.CalledProcessError(return_code, args, output='\n'.join(tail))
+        return return_code
 
     def start_op(self, task_id, scheduled: bool, not_scheduled_datasets: Optional[List[StarlakeDataset]], least_frequent_datasets: Optional[List[StarlakeDataset]], most_frequent_datasets: Optional[List[StarlakeDataset]], **kwargs) -> Optional[BaseOperator]:
         """Overrides IStarlakeJob.start_op()
@@ -149,6 +223,7 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         Returns:
             Optional[BaseOperator]: The optional Airflow task.
         """
+        check_dataset_windows = not scheduled and most_frequent_datasets and self.stable_uri()
         if not scheduled and least_frequent_datasets:
             with TaskGroup(group_id=f'{task_id}') as start:
                 with TaskGroup(group_id=f'trigger_least_frequent_datasets') as trigger_least_frequent_datasets:
@@ -159,10 +234,74 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
                             previous=True,
                             source=self.source,
                             **kwargs.copy())
+                if check_dataset_windows:
+                    self.check_dataset_windows_op('check_dataset_windows', most_frequent_datasets, **kwargs.copy()) >> trigger_least_frequent_datasets
             return start 
+        elif check_dataset_windows:
+            kwargs.pop('events', None)
+            return self.check_dataset_windows_op(task_id, most_frequent_datasets, **kwargs)
         else:
             return super().start_op(task_id, scheduled, not_scheduled_datasets, least_frequent_datasets, most_frequent_datasets, **kwargs)
 
+    def resolve_windows_op(self, task_id: str, crons: List[str], **kwargs) -> BaseOperator:
+        """Generate the Airflow task that resolves once per dag run the schedule windows of the cron expressions, pushing them to XCom.
+
+        Args:
+            task_id (str): The required task id.
+            crons (List[str]): The cron expressions used by the tasks of the dag.
+
+        Returns:
+            BaseOperator: The Airflow task.
+        """
+        from ai.starlake.common import sl_cron_windows
+        kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
+        kwargs.update({'doc': kwargs.get('doc', 'Resolve the schedule windows of the dag run.')})
+        return PythonOperator(
+            task_id=task_id,
+            python_callable=sl_cron_windows,
+            op_kwargs={'crons': crons, 'ts': '{{ data_interval_end | ts }}'},
+            **kwargs
+        )
+
+    def check_dataset_windows_op(self, task_id: str, datasets: List[StarlakeDataset], **kwargs) -> BaseOperator:
+        """Generate the Airflow task that checks that the events which triggered the dag run belong to the same schedule window.
+        The datasets being published with a stable uri, a dag run is triggered as soon as each of its datasets has been updated,
+        this task skipping the dag run if the latest events of the datasets sharing the same cron carry distinct schedules.
+        The events which triggered a skipped dag run are consumed as for any other dag run: they are not queued again,
+        the dag being triggered next once each of its datasets has been updated again.
+
+        Args:
+            task_id (str): The required task id.
+            datasets (List[StarlakeDataset]): The scheduled datasets to check.
+
+        Returns:
+            BaseOperator: The Airflow task.
+        """
+        def f_check_dataset_windows(datasets: dict, **context) -> bool:
+            logger = logging.getLogger(__name__)
+            triggering_dataset_events = context.get('triggering_dataset_events', None) or dict()
+            windows_by_cron: dict = dict()
+            for uri, (cron, parameter_name) in datasets.items():
+                windows = [event.extra.get(parameter_name) for event in triggering_dataset_events.get(uri, []) if (event.extra or dict()).get(parameter_name, None)]
+                if windows:
+                    windows_by_cron.setdefault(cron, dict())[uri] = max(windows)
+            for cron, windows in windows_by_cron.items():
+                if set(windows.values()).__len__() > 1:
+                    logger.warning(f"Datasets scheduled with {cron} triggered for distinct schedules: {windows}, the dag run is skipped and its triggering events are consumed")
+                    return False
+            return True
+
+        kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
+        kwargs.update({'doc': kwargs.get('doc', 'Check that the datasets which triggered the dag run belong to the same schedule window.')})
+        return ShortCircuitOperator(
+            task_id=task_id,
+            python_callable=f_check_dataset_windows,
+            op_kwargs={'datasets': {dataset.uri: (dataset.cron, dataset.sl_schedule_parameter_name) for dataset in datasets}},
+            **kwargs
+        )
+
     def sl_pre_load(self, domain: str, tables: set=set(), pre_load_strategy: Union[StarlakePreLoadStrategy, str, None] = None, **kwargs) -> Optional[BaseOperator]:
         """Overrides IStarlakeJob.sl_pre_load()
         Generate the Airflow group of tasks that will check if the conditions are met to load the specified domain according to the pre-load strategy choosen.
@@ -236,6 +375,7 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         upstream_task_id = upstream_task.task_id
         task_id = task_id or f"validating_{upstream_task_id.split('.')[-1]}"
         kwargs.pop("task_id", None)
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
 
         return ShortCircuitOperator(
             task_id = task_id,
@@ -262,6 +402,7 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
         kwargs.update({'doc': kwargs.get('doc', f'Load table {table} within {domain} domain.')})
         kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
         return super().sl_load(task_id=task_id, domain=domain, table=table, spark_config=spark_config, dataset=dataset, **kwargs)
 
     def sl_transform(self, task_id: str, transform_name: str, transform_options: str=None, spark_config: Optional[StarlakeSparkConfig] = None, dataset: Optional[Union[StarlakeDataset, str]]= None, **kwargs) -> BaseOperator:
@@ -280,6 +421,7 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
         kwargs.update({'doc': kwargs.get('doc', f'Run {transform_name} transform.')})
         kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
         return super().sl_transform(task_id=task_id, transform_name=transform_name, transform_options=transform_options, spark_config=spark_config, dataset=dataset,  **kwargs)
 
     def dummy_op(self, task_id, events: Optional[List[Dataset]] = None, **kwargs) -> BaseOperator :
@@ -295,12 +437,158 @@ class StarlakeAirflowJob(IStarlakeJob[BaseOperator, Dataset], StarlakeAirflowOpt
         """
 
         kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update(self.critical_path_args(task_id, **kwargs))
         outlets: List[Dataset] = kwargs.get("outlets", [])
         if events:
             outlets += events
+            if self.stable_uri():
+                def publish_events_extra(context):
+                    # the extra of the events published for static outlets is the one set at runtime
+                    for event in events:
+                        context["outlet_events"][event].extra.update(event.extra or {})
+                callbacks = kwargs.get('on_execute_callback', None) or []
+                if not isinstance(callbacks, list):
+                    callbacks = [callbacks]
+                kwargs.update({'on_execute_callback': callbacks + [publish_events_extra]})
         kwargs.update({'outlets': outlets})
         return EmptyOperator(task_id=task_id, **kwargs)
 
+    def critical_path_args(self, task_id: str, **kwargs) -> dict:
+        """Returns the priority weight and the pool with which the task has to be created when critical_path_priority is set,
+        as computed for the current dag by the last run of its critical path task and stored in an Airflow variable,
+        so that no task duration is queried while the dag is parsed.
+
+        Args:
+            task_id (str): The required task id.
+            **kwargs: The keyword arguments of the task.
+
+        Returns:
+            dict: The priority_weight, weight_rule and pool arguments of the task, empty if the task has no priority yet.
+        """
+        if not self.critical_path_priority or 'priority_weight' in kwargs:
+            return dict()
+        from airflow.models.dag import DagContext
+        dag = kwargs.get('dag', None) or DagContext.get_current_dag()
+        if dag is None:
+            return dict()
+        if dag.dag_id not in self._critical_paths:
+            import json
+            from airflow.models import Variable
+            try:
+                self._critical_paths[dag.dag_id] = json.loads(Variable.get(CRITICAL_PATH_VARIABLE.format(dag_id=dag.dag_id), default_var='{}'))
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Failed to read the critical path of {dag.dag_id}: {e}")
+                self._critical_paths[dag.dag_id] = dict()
+        task_group = kwargs.get('task_group', None) or TaskGroupContext.get_current_task_group(dag)
+        critical_path = self._critical_paths[dag.dag_id].get(task_group.child_id(task_id) if task_group else task_id, None)
+        if not critical_path:
+            return dict()
+        args = {'priority_weight': critical_path['priority_weight'], 'weight_rule': 'absolute'}
+        if critical_path.get('pool', None) and kwargs.get('pool', self.pool) == self.pool:
+            # only the tasks of the default pool of the job are routed
+            args['pool'] = critical_path['pool']
+        return args
+
+    def task_durations(self, dag_id: str) -> dict:
+        """Returns the expected duration in seconds of the tasks of the dag, as configured by the task_durations option,
+        either a map in json format or `history` to use the average duration of their successful runs over the last critical_path_lookback_days days.
+
+        Args:
+            dag_id (str): The required dag id.
+
+        Returns:
+            dict: The expected duration of the tasks by task id.
+        """
+        task_durations = str(__class__.get_context_var(var_name='task_durations', default_value='', options=self.options)).strip()
+        if not task_durations:
+            return dict()
+        elif task_durations.lower() == 'history':
+            from sqlalchemy import func
+            from airflow.models import TaskInstance
+            from airflow.utils.session import create_session
+            from airflow.utils.state import TaskInstanceState
+            lookback_days = int(__class__.get_context_var(var_name='critical_path_lookback_days', default_value='30', options=self.options))
+            with create_session() as session:
+                rows = session.query(TaskInstance.task_id, func.avg(TaskInstance.duration)).filter(
+                    TaskInstance.dag_id == dag_id,
+                    TaskInstance.state == TaskInstanceState.SUCCESS,
+                    TaskInstance.start_date >= datetime.now().astimezone() - timedelta(days=lookback_days),
+                ).group_by(TaskInstance.task_id).all()
+            return {task_id: float(duration) for task_id, duration in rows if duration is not None}
+        else:
+            import json
+            return {task_id: float(duration) for task_id, duration in json.loads(task_durations).items()}
+
+    def critical_path(self, dag, durations: dict) -> dict:
+        """Returns for each task of the dag its priority weight, i.e the expected duration of the longest path from the task to the end of the dag,
+        the tasks without expected duration counting for the median duration of the others or for one, and the pool matching its expected duration.
+
+        Args:
+            dag (DAG): The required dag.
+            durations (dict): The expected duration of the tasks by task id.
+
+        Returns:
+            dict: The priority weight and the optional pool of the tasks by task id.
+        """
+        import json
+        # pools by maximum duration in seconds, i.e {"short_pool": 60, "default_pool": 3600}
+        pools = sorted(json.loads(str(__class__.get_context_var(var_name='critical_path_pools', default_value='{}', options=self.options))).items(), key=lambda pool: float(pool[1]))
+        default_duration = sorted(durations.values())[len(durations) // 2] if durations else 1.0
+
+        remaining: dict = dict()
+        def remaining_length(task) -> float:
+            # iterative depth first search to avoid deep recursions on long chains
+            stack = [(task, False)]
+            while stack:
+                current, expanded = stack.pop()
+                if current.task_id in remaining:
+                    continue
+                downstream = current.downstream_list
+                if expanded or not downstream:
+                    remaining[current.task_id] = durations.get(current.task_id, default_duration) + max([remaining.get(t.task_id, 0.0) for t in downstream], default=0.0)
+                else:
+                    stack.append((current, True))
+                    stack.extend([(t, False) for t in downstream if t.task_id not in remaining])
+            return remaining[task.task_id]
+
+        critical_path: dict = dict()
+        for task in dag.tasks:
+            duration = durations.get(task.task_id, default_duration)
+            critical_path[task.task_id] = {
+                'priority_weight': max(1, int(round(remaining_length(task)))),
+                'pool': next((name for name, max_duration in pools if duration <= float(max_duration)), pools[-1][0]) if pools else None,
+            }
+        return critical_path
+
+    def critical_path_op(self, task_id: str, **kwargs) -> BaseOperator:
+        """Generate the Airflow task that computes the critical path of the dag from the expected durations of its tasks
+        and stores it in the Airflow variable read by critical_path_args the next time the dag is parsed.
+
+        Args:
+            task_id (str): The required task id.
+
+        Returns:
+            BaseOperator: The Airflow task.
+        """
+        def f_critical_path(**context) -> None:
+            import json
+            from airflow.models import Variable
+            dag = context['dag']
+            try:
+                critical_path = self.critical_path(dag, self.task_durations(dag.dag_id))
+                Variable.set(CRITICAL_PATH_VARIABLE.format(dag_id=dag.dag_id), json.dumps(critical_path))
+            except Exception as e:
+                # the priorities are an optimization which must not fail the dag run
+                logging.getLogger(__name__).warning(f"Failed to compute the critical path of {dag.dag_id}: {e}")
+
+        kwargs.update({'pool': kwargs.get('pool', self.pool)})
+        kwargs.update({'doc': kwargs.get('doc', 'Compute the priority weights of the tasks of the dag from their expected durations.')})
+        return PythonOperator(
+            task_id=task_id,
+            python_callable=f_critical_path,
+            **kwargs
+        )
+
     def default_dag_args(self) -> dict:
         import json
         from json.decoder import JSONDecodeError
@@ -341,10 +629,12 @@ class StarlakeDatasetMixin(LoggingMixin):
                     'previous': previous
                 })
                 kwargs['params'] = params
-                self.dataset = "{{sl_scheduled_dataset(params.uri, params.sl_schedule, data_interval_end | ts, params.sl_schedule_parameter_name, params.sl_schedule_format, params.previous)}}"
+                self.dataset = "{{sl_window_dataset(params.uri, sl_window(ti, params.sl_schedule, data_interval_end | ts, 'previous' if params.previous else 'current'), params.sl_schedule_parameter_name, params.sl_schedule_format)}}"
             else:
                 self.dataset = dataset
-            outlets.append(DatasetAlias(self.alias))
+            if DatasetAlias(self.alias) not in outlets:
+                # the alias may already be declared, i.e by a mapped operator
+                outlets.append(DatasetAlias(self.alias))
             kwargs["outlets"] = outlets
             self.outlets = outlets
             self.template_fields = getattr(self, "template_fields", tuple()) + ("dataset",)
@@ -356,12 +646,20 @@ class StarlakeDatasetMixin(LoggingMixin):
     def pre_execute(self, context):
         if self.dataset:
             self.log.info(f"Pre execute {self.task_id} with dataset={self.dataset}, alias={self.alias}, extra={self.extra}, outlets={self.outlets}")
-            from urllib.parse import parse_qs
+            from urllib.parse import parse_qs, parse_qsl
             uri: str = self.render_template(self.dataset, context)
             query = uri.split("?")
-            if query.__len__() > 1:
-                self.extra.update(parse_qs(query[-1]))
-            context["outlet_events"][self.alias].add(Dataset(uri, self.extra))
+            if AirflowDataset.stable_uri():
+                # publish the stable uri of the sink, the schedule being carried by the extra of the event
+                extra = {"source": self.extra.get("source", None)} if self.extra.get("source", None) else {}
+                if query.__len__() > 1:
+                    extra.update(dict(parse_qsl(query[-1])))
+                self.extra = extra
+                context["outlet_events"][self.alias].add(Dataset(query[0]), extra)
+            else:
+                if query.__len__() > 1:
+                    self.extra.update(parse_qs(query[-1]))
+                context["outlet_events"][self.alias].add(Dataset(uri, self.extra))
         return super().pre_execute(context)
 
     @apply_lineage
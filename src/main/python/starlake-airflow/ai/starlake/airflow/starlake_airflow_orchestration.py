@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from ai.starlake.airflow.starlake_airflow_job import StarlakeAirflowJob, AirflowDataset
 
-from ai.starlake.common import sl_cron_start_end_dates, sl_scheduled_dataset
+from ai.starlake.airflow.starlake_airflow_api import AirflowApiClient, AirflowRunMonitor
+
+from ai.starlake.common import sl_cron_start_end_dates, sl_cron_windows, sl_scheduled_dataset, sl_window_dataset, is_valid_cron
 
 from ai.starlake.job import StarlakeOrchestrator, StarlakeExecutionMode
 
@@ -16,6 +18,8 @@ from airflow.datasets import Dataset
 
 from airflow.models.baseoperator import BaseOperator
 
+from airflow.models.mappedoperator import MappedOperator
+
 from airflow.utils.task_group import TaskGroup, TaskGroupContext
 
 from airflow.utils.state import DagRunState
@@ -24,6 +28,35 @@ from typing import Any, List, Optional, TypeVar, Union
 
 J = TypeVar("J", bound=StarlakeAirflowJob)
 
+RESOLVE_WINDOWS_TASK_ID = "sl_resolve_windows"
+
+CRITICAL_PATH_TASK_ID = "sl_critical_path"
+
+_resolved_windows: dict = dict()
+
+def sl_window(ti, cron: Optional[str], ts: str, key: str = 'sl_dates') -> Optional[str]:
+    """Returns the schedule window of the cron expression for the dag run of the task instance,
+    as resolved once per dag run by the sl_resolve_windows task if the dag contains it, or resolved at the given timestamp otherwise.
+    Args:
+        ti (TaskInstance): the task instance.
+        cron (Optional[str]): the optional cron expression.
+        ts (str): the timestamp at which the window is resolved if it has not been already.
+        key (str): the window value to return, one of sl_dates, current or previous. Defaults to sl_dates.
+    Returns:
+        Optional[str]: the window value or None if no cron expression has been provided.
+    """
+    if not cron:
+        return None
+    windows = None
+    if ti.task.dag.has_task(RESOLVE_WINDOWS_TASK_ID):
+        run_key = (ti.dag_id, ti.run_id)
+        if run_key not in _resolved_windows:
+            _resolved_windows.clear()
+            _resolved_windows[run_key] = ti.xcom_pull(task_ids=RESOLVE_WINDOWS_TASK_ID, key='return_value') or dict()
+        windows = _resolved_windows[run_key]
+    window = (windows or dict()).get(cron, None) or sl_cron_windows([cron], ts)[cron]
+    return window[key]
+
 class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], AirflowDataset):
     def __init__(self, job: J, schedule: Optional[StarlakeSchedule] = None, dependencies: Optional[StarlakeDependencies] = None, orchestration: Optional[AbstractOrchestration[DAG, BaseOperator, TaskGroup, Dataset]] = None, **kwargs) -> None:
         super().__init__(job, orchestration_cls=AirflowOrchestration, dag=None, schedule=schedule, dependencies=dependencies, orchestration=orchestration, **kwargs)
@@ -33,7 +66,9 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
         if self.cron is not None:
             airflow_schedule = self.cron
         elif self.events is not None:
-            airflow_schedule = self.events
+            # with stable dataset uris, the dag is triggered once all its datasets have been updated, whatever their schedule,
+            # the start task checking that the triggering events belong to the same schedule window
+            airflow_schedule = list({event.uri: event for event in self.events}.values())
 
         def ts_as_datetime(ts):
             # Convert ts to a datetime object
@@ -45,6 +80,8 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
         user_defined_macros["sl_dates"] = sl_cron_start_end_dates
         user_defined_macros["ts_as_datetime"] = ts_as_datetime
         user_defined_macros["sl_scheduled_dataset"] = sl_scheduled_dataset
+        user_defined_macros["sl_window"] = sl_window
+        user_defined_macros["sl_window_dataset"] = sl_window_dataset
 
         user_defined_filters = kwargs.get('user_defined_filters', job.caller_globals.get('user_defined_filters', None))
         kwargs.pop('user_defined_filters', None)
@@ -109,45 +146,155 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
 
         update_group_dependencies(self)
 
+        if self.job.resolve_windows:
+            self.add_resolve_windows_task()
+
+        if self.job.critical_path_priority:
+            self.job.critical_path_op(task_id=CRITICAL_PATH_TASK_ID, dag=self.dag, task_group=self.dag.task_group)
+
         return super().__exit__(exc_type, exc_value, traceback)
 
+    def add_resolve_windows_task(self) -> None:
+        """Add upstream of all the tasks of the pipeline the task resolving once per dag run the schedule windows of the cron expressions used by its tasks,
+        the windows being then read by the sl_window macro from its XCom instead of being resolved again by each task.
+        """
+        crons = set([self.computed_cron_expr] + [dataset.cron for dataset in self.datasets or []])
+        for task in self.dag.tasks:
+            params = task.partial_kwargs.get('params', None) if isinstance(task, MappedOperator) else task.params
+            for key in ['sl_schedule', 'cron_expr']:
+                crons.add((params or dict()).get(key, None))
+        crons = sorted([cron for cron in crons if isinstance(cron, str) and is_valid_cron(cron)])
+        if not crons:
+            return
+        roots = self.dag.roots
+        resolve_windows = self.job.resolve_windows_op(task_id=RESOLVE_WINDOWS_TASK_ID, crons=crons, dag=self.dag, task_group=self.dag.task_group)
+        resolve_windows.set_downstream(roots)
+
     def sl_transform_options(self, cron_expr: Optional[str] = None) -> Optional[str]:
         if cron_expr:
-            return "{{sl_dates(params.cron_expr, ts_as_datetime(data_interval_end | ts))}}"
+            return "{{sl_window(ti, params.cron_expr, data_interval_end | ts)}}"
         return None
 
-    def deploy(self, **kwargs) -> None:
-        """Deploy the pipeline."""
+    @classmethod
+    def dags_folder(cls, **kwargs) -> str:
+        """Returns the Airflow dags folder the pipelines are deployed to.
+        Args:
+            AIRFLOW_HOME (str): the Airflow home. Defaults to the AIRFLOW_HOME environment variable or /opt/airflow.
+        """
         import os
         env = os.environ.copy() # Copy the current environment variables
-        DAG_ID = self.pipeline_id
         AIRFLOW_HOME = kwargs.get('AIRFLOW_HOME', env.get('AIRFLOW_HOME', "/opt/airflow"))
-        AIRFLOW_DAGS = f"{AIRFLOW_HOME}/dags"
-        import shutil
+        return f"{AIRFLOW_HOME}/dags"
+
+    def dag_file(self, dags_folder: str, dag_shards: int = 0) -> str:
+        """Returns the path of the dag file of the pipeline, within one of the shard_<n> sub-directories of the dags folder if they are sharded.
+        Args:
+            dags_folder (str): the Airflow dags folder.
+            dag_shards (int): the number of sub-directories the dag files are spread over, 0 to deploy them at the root of the dags folder. Defaults to 0.
+        """
+        DAG_ID = self.pipeline_id
+        if dag_shards > 0:
+            import hashlib
+            # the shard of a pipeline must not depend on the process, unlike hash()
+            shard = int(hashlib.sha256(DAG_ID.encode()).hexdigest()[:8], 16) % dag_shards
+            return f"{dags_folder}/shard_{shard:03d}/{DAG_ID}.py"
+        return f"{dags_folder}/{DAG_ID}.py"
+
+    def deploy(self, **kwargs) -> None:
+        """Deploy the pipeline.
+        Args:
+            AIRFLOW_HOME (str): the Airflow home. Defaults to the AIRFLOW_HOME environment variable or /opt/airflow.
+            dag_shards (int): the number of sub-directories the dag files are spread over, 0 to deploy them at the root of the dags folder. Defaults to 0.
+        """
+        self.deploy_dag_file(self.__class__.dags_folder(**kwargs), int(kwargs.get('dag_shards', 0)))
+
+    def deploy_dag_file(self, dags_folder: str, dag_shards: int = 0) -> bool:
+        """Write the dag file of the pipeline to the dags folder through a temporary file atomically renamed, so that Airflow never parses a partially written file,
+        the file being left untouched, and not parsed again, if its content has not changed.
+        Args:
+            dags_folder (str): the Airflow dags folder.
+            dag_shards (int): the number of sub-directories the dag files are spread over, 0 to deploy them at the root of the dags folder. Defaults to 0.
+        Returns:
+            bool: whether the dag file has been written.
+        """
+        import hashlib, os, stat, tempfile
         from pathlib import Path
-        DAG_FILE = f"{AIRFLOW_DAGS}/{DAG_ID}.py"
-        shutil.copyfile(Path(self.job.caller_globals['__file__']), Path(DAG_FILE))
+        DAG_ID = self.pipeline_id
+        DAG_FILE = Path(self.dag_file(dags_folder, dag_shards))
+        content = Path(self.job.caller_globals['__file__']).read_bytes()
+
+        # remove the dag file deployed with another sharding, which would define the same dag twice
+        for other_file in [Path(self.dag_file(dags_folder))] + list(Path(dags_folder).glob(f"shard_*/{DAG_ID}.py")):
+            if other_file != DAG_FILE and other_file.exists():
+                other_file.unlink()
+                print(f"Pipeline {DAG_ID} removed from {other_file}")
+
+        if DAG_FILE.exists() and DAG_FILE.stat().st_size == content.__len__() and hashlib.sha256(DAG_FILE.read_bytes()).digest() == hashlib.sha256(content).digest():
+            print(f"Pipeline {DAG_ID} unchanged in {DAG_FILE}")
+            return False
+
+        DAG_FILE.parent.mkdir(parents=True, exist_ok=True)
+        mode = stat.S_IMODE(DAG_FILE.stat().st_mode) if DAG_FILE.exists() else 0o644
+        # the temporary file is hidden and without the .py extension so that it is ignored by the dag processor
+        fd, temp_file = tempfile.mkstemp(dir=DAG_FILE.parent, prefix=f".{DAG_ID}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_file, mode)
+            os.replace(temp_file, DAG_FILE)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+            raise
         print(f"Pipeline {DAG_ID} deployed to {DAG_FILE}")
+        return True
+
+    @classmethod
+    def deploy_all(cls, pipelines: List[AbstractPipeline], **kwargs) -> None:
+        """Deploy several pipelines concurrently, each dag file being written atomically and only if its content has changed.
+        Args:
+            pipelines (List[AbstractPipeline]): the pipelines to deploy.
+            AIRFLOW_HOME (str): the Airflow home. Defaults to the AIRFLOW_HOME environment variable or /opt/airflow.
+            dag_shards (int): the number of sub-directories the dag files are spread over, 0 to deploy them at the root of the dags folder. Defaults to 0.
+            deploy_concurrency (int): the maximum number of pipelines deployed at the same time. Defaults to 4.
+        """
+        import time
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        pipelines = [pipeline for pipeline in pipelines if isinstance(pipeline, AirflowPipeline)]
+        if not pipelines:
+            return
+        concurrency = max(1, min(int(kwargs.get('deploy_concurrency', 4)), pipelines.__len__()))
+        dags_folder = cls.dags_folder(**kwargs)
+        dag_shards = int(kwargs.get('dag_shards', 0))
+
+        deployed = []
+        unchanged = []
+        failures = dict()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(pipeline.deploy_dag_file, dags_folder, dag_shards): pipeline.pipeline_id for pipeline in pipelines}
+            for future in as_completed(futures):
+                pipeline_id = futures[future]
+                try:
+                    if future.result():
+                        deployed.append(pipeline_id)
+                    else:
+                        unchanged.append(pipeline_id)
+                except Exception as e:
+                    failures[pipeline_id] = e
+                    print(f"Pipeline {pipeline_id} failed to deploy: {e}")
+        elapsed = time.perf_counter() - start
+
+        print(f"Deployed {deployed.__len__()} pipelines, {unchanged.__len__()} unchanged, {failures.__len__()} failed in {elapsed:.1f}s with {concurrency} workers")
+        if failures:
+            raise RuntimeError(f"Failed to deploy the pipelines {', '.join(sorted(failures.keys()))}")
 
     def delete(self, **kwargs) -> None:
         """Delete the pipeline."""
-        import os
-        env = os.environ.copy() # Copy the current environment variables
         DAG_ID = self.pipeline_id
-        AIRFLOW_BASE_URL = kwargs.get('AIRFLOW_BASE_URL', env.get('AIRFLOW_BASE_URL', "http://localhost:8080"))
-        AIRFLOW_API_BASE_URL = f"{AIRFLOW_BASE_URL}/api/v1"
-        AIRFLOW_USERNAME = kwargs.get('AIRFLOW_USERNAME', env.get('AIRFLOW_USERNAME', None))
-        AIRFLOW_PASSWORD = kwargs.get('AIRFLOW_PASSWORD', env.get('AIRFLOW_PASSWORD', None))
-        if AIRFLOW_USERNAME and AIRFLOW_PASSWORD:
-            AIRFLOW_AUTH = (AIRFLOW_USERNAME, AIRFLOW_PASSWORD)
-        else:
-            AIRFLOW_AUTH = None
-        import requests
-        response = requests.delete(
-            f"{AIRFLOW_API_BASE_URL}/dags/{DAG_ID}",
-            headers={'Content-Type': 'application/json'},
-            auth=AIRFLOW_AUTH
-        )
+        response = AirflowApiClient.shared(**kwargs).delete(f"dags/{DAG_ID}")
         response.raise_for_status()
         print(f"Pipeline {DAG_ID} deleted")
 
@@ -157,10 +304,10 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
             logical_date (Optional[str]): the logical date.
             timeout (str): the timeout in seconds.
             mode (StarlakeExecutionMode): the execution mode.
+            monitor (Optional[AirflowRunMonitor]): the optional monitor the dag run is handed over to instead of being awaited.
         """
-        import os
-        env = os.environ.copy() # Copy the current environment variables
         DAG_ID = self.pipeline_id
+        monitor: Optional[AirflowRunMonitor] = kwargs.pop('monitor', None)
         if mode == StarlakeExecutionMode.DRY_RUN:
             # Test the pipeline with the given configuration
             from datetime import datetime
@@ -179,16 +326,8 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
                 print(f"Pipeline {DAG_ID} failed with error {str(e)}")
 
         elif mode == StarlakeExecutionMode.RUN:
-            import time
             # Run the pipeline with the given configuration
-            AIRFLOW_BASE_URL = kwargs.get('AIRFLOW_BASE_URL', env.get('AIRFLOW_BASE_URL', "http://localhost:8080"))
-            AIRFLOW_API_BASE_URL = f"{AIRFLOW_BASE_URL}/api/v1"
-            AIRFLOW_USERNAME = kwargs.get('AIRFLOW_USERNAME', env.get('AIRFLOW_USERNAME', None))
-            AIRFLOW_PASSWORD = kwargs.get('AIRFLOW_PASSWORD', env.get('AIRFLOW_PASSWORD', None))
-            if AIRFLOW_USERNAME and AIRFLOW_PASSWORD:
-                AIRFLOW_AUTH = (AIRFLOW_USERNAME, AIRFLOW_PASSWORD)
-            else:
-                AIRFLOW_AUTH = None
+            client = AirflowApiClient.shared(**kwargs)
             payload = {k: kwargs[k] for k in ['conf', 'logical_date', 'execution_date', 'dag_run_id'] if k in kwargs}
             # conf = kwargs.get('conf', {'backfill': True})
             # payload['conf'] = conf
@@ -200,41 +339,21 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
                 payload['logical_date'] = logical_date + 'Z'
                 payload['execution_date'] = logical_date + 'Z'
             print(f"Starting pipeline {DAG_ID} with configuration {payload}")
-            import requests
-            response = requests.post(
-                f"{AIRFLOW_API_BASE_URL}/dags/{DAG_ID}/dagRuns",
-                headers={'Content-Type': 'application/json'},
-                json=payload,
-                auth=AIRFLOW_AUTH
-            )
             try:
-                response.raise_for_status()
+                dag_run_id = self.trigger_dag_run(client, payload)
             except Exception as e:
                 print(f"Pipeline {DAG_ID} failed with error {str(e)}")
                 return
-            json_response: dict = response.json() or dict()
-            dag_run_id = json_response.get('dag_run_id', None)
             if dag_run_id:
                 print(f"Pipeline {DAG_ID} started with dag_run_id {dag_run_id}")
-                def check_state() -> bool:
-                    response = requests.get(
-                        f"{AIRFLOW_API_BASE_URL}/dags/{DAG_ID}/dagRuns/{dag_run_id}",
-                        headers={'Content-Type': 'application/json'},
-                        auth=AIRFLOW_AUTH
-                    )
-                    response.raise_for_status()
-                    json_response = response.json()
-                    state = json_response.get('state', None)
-                    if state == DagRunState.FAILED:
-                        raise Exception(f"Pipeline {DAG_ID} failed")
-                    elif state == DagRunState.SUCCESS:
-                        print(f"Pipeline {DAG_ID} succeeded")
-                        return True
-                    elif state == DagRunState.RUNNING:
-                        print(f"Pipeline {DAG_ID} is running")
-                        time.sleep(5)
-                        return check_state()
-                check_state()
+                if monitor:
+                    # the dag run will be awaited by the caller along with the other dag runs of the monitor
+                    monitor.watch(DAG_ID, dag_run_id, payload.get('logical_date', None))
+                else:
+                    monitor = AirflowRunMonitor(client, timeout=float(timeout) if timeout else None)
+                    future = monitor.watch(DAG_ID, dag_run_id, payload.get('logical_date', None))
+                    monitor.wait()
+                    future.result()
             else:
                 raise Exception(f"Pipeline {DAG_ID} failed")
 
@@ -245,11 +364,145 @@ class AirflowPipeline(AbstractPipeline[DAG, BaseOperator, TaskGroup, Dataset], A
             conf = kwargs.get('conf', {})
             conf['backfill'] = True
             kwargs.update({'conf': conf})
-            self.run(logical_date=logical_date, timeout=timeout, mode=StarlakeExecutionMode.RUN, **kwargs)
+            self.run(logical_date=logical_date, timeout=timeout, mode=StarlakeExecutionMode.RUN, monitor=monitor, **kwargs)
 
         else:
             raise ValueError(f"Execution mode {mode} is not supported")
 
+    def trigger_dag_run(self, client: AirflowApiClient, payload: dict) -> Optional[str]:
+        """Trigger a dag run of the pipeline.
+        The dag run is always created with an explicit id, so that a retried POST whose first attempt has been processed by the webserver
+        is answered by a 409 for that same id, instead of creating a duplicate dag run.
+        Args:
+            client (AirflowApiClient): the Airflow REST API client.
+            payload (dict): the dag run to create.
+        Returns:
+            Optional[str]: the id of the dag run.
+        """
+        if not payload.get('dag_run_id', None):
+            import uuid
+            payload['dag_run_id'] = f"manual_run_{uuid.uuid4()}"
+        dag_run_id = payload['dag_run_id']
+        response = client.post(f"dags/{self.pipeline_id}/dagRuns", json=payload)
+        if response.status_code == 409:
+            # the conflict may be caused by a previous attempt of the same trigger or by another dag run with the same logical date
+            existing = client.get(f"dags/{self.pipeline_id}/dagRuns/{dag_run_id}")
+            if existing.status_code == 200:
+                return dag_run_id
+        response.raise_for_status()
+        json_response: dict = response.json() or dict()
+        return json_response.get('dag_run_id', None)
+
+    def existing_dag_runs(self, client: AirflowApiClient, start_date: str, end_date: str) -> dict:
+        """Retrieve the dag runs of the pipeline between two logical dates.
+        Args:
+            client (AirflowApiClient): the Airflow REST API client.
+            start_date (str): the first logical date.
+            end_date (str): the last logical date.
+        Returns:
+            dict: the state of the existing dag runs by logical date.
+        """
+        from datetime import datetime
+        def normalize(date: str) -> str:
+            return datetime.fromisoformat(date.replace('Z', '+00:00')).replace(tzinfo=None).isoformat()
+        existing = dict()
+        body = {
+            'dag_ids': [self.pipeline_id],
+            'execution_date_gte': f"{start_date}Z",
+            'execution_date_lte': f"{end_date}Z",
+            'page_limit': 100,
+            'page_offset': 0,
+        }
+        while True:
+            response = client.post("dags/~/dagRuns/list", json=body)
+            response.raise_for_status()
+            json_response: dict = response.json() or dict()
+            dag_runs = json_response.get('dag_runs', [])
+            for dag_run in dag_runs:
+                date = dag_run.get('logical_date', dag_run.get('execution_date', None))
+                if date:
+                    existing[normalize(date)] = dag_run.get('state', None)
+            body['page_offset'] += dag_runs.__len__()
+            if not dag_runs or body['page_offset'] >= int(json_response.get('total_entries', 0)):
+                break
+        return existing
+
+    def backfill_runs(self, logical_dates: List[str], timeout: str = '120', **kwargs) -> None:
+        """Trigger the dag runs of all the logical dates to backfill, skipping those which already exist,
+        while keeping at most max_active_runs dag runs in progress.
+        Args:
+            logical_dates (List[str]): the logical dates to backfill, in chronological order.
+            timeout (str): the timeout in seconds of each dag run.
+            max_active_runs (int): the maximum number of dag runs in progress. Defaults to the max_active_runs of the dag.
+            poll_interval (float): the delay in seconds between two refreshes of the dag runs in progress. Defaults to 5.
+        """
+        import math
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        DAG_ID = self.pipeline_id
+        if not logical_dates:
+            print(f"Nothing to backfill for pipeline {DAG_ID}")
+            return
+        max_active_runs = max(1, int(kwargs.pop('max_active_runs', self.dag.max_active_runs or 16)))
+        poll_interval = float(kwargs.pop('poll_interval', 5))
+        client = AirflowApiClient.shared(**kwargs)
+
+        from datetime import datetime
+        normalized = {datetime.fromisoformat(logical_date).replace(tzinfo=None).isoformat(): logical_date for logical_date in logical_dates}
+        existing = self.existing_dag_runs(client, min(normalized.keys()), max(normalized.keys()))
+        for date, state in sorted(existing.items()):
+            if date in normalized:
+                print(f"Pipeline {DAG_ID} already has a dag run with logical date {date} ({state})")
+        remaining = [logical_date for date, logical_date in normalized.items() if date not in existing]
+        total = remaining.__len__()
+        if not total:
+            print(f"All the {logical_dates.__len__()} dag runs of pipeline {DAG_ID} already exist")
+            return
+
+        conf = dict(kwargs.get('conf', {}))
+        conf['backfill'] = True
+        def payload(logical_date: str) -> dict:
+            return {
+                'conf': conf,
+                # a deterministic id makes the trigger idempotent
+                'dag_run_id': f"backfill__{logical_date}",
+                'logical_date': f"{logical_date}Z",
+                'execution_date': f"{logical_date}Z",
+            }
+
+        def trigger(logical_date: str) -> Optional[str]:
+            try:
+                return self.trigger_dag_run(client, payload(logical_date))
+            except Exception as e:
+                print(f"Pipeline {DAG_ID} failed to start for logical date {logical_date} with error {str(e)}")
+                return None
+
+        monitor = AirflowRunMonitor(client, interval=poll_interval)
+        futures = dict()
+        failures = []
+        deadline = time.monotonic() + float(timeout) * math.ceil(total / max_active_runs) if timeout else None
+        print(f"Backfilling {total} dag runs of pipeline {DAG_ID} with at most {max_active_runs} active runs")
+        with ThreadPoolExecutor(max_workers=min(max_active_runs, 8)) as executor:
+            while remaining or monitor.pending:
+                # fill the window of active runs
+                slots = max_active_runs - monitor.pending.__len__()
+                batch, remaining = remaining[:slots], remaining[slots:]
+                for logical_date, dag_run_id in zip(batch, executor.map(trigger, batch)):
+                    if dag_run_id:
+                        futures[logical_date] = monitor.watch(DAG_ID, dag_run_id, f"{logical_date}Z")
+                    else:
+                        failures.append(logical_date)
+                if monitor.poll():
+                    if deadline and time.monotonic() >= deadline:
+                        raise TimeoutError(f"Backfill of pipeline {DAG_ID} timed out with {monitor.pending.__len__()} dag runs in progress and {remaining.__len__()} not triggered")
+                    time.sleep(poll_interval)
+                done = [logical_date for logical_date, future in futures.items() if future.done()]
+                failed = [logical_date for logical_date in done if futures[logical_date].exception()]
+                print(f"Backfill of pipeline {DAG_ID}: {done.__len__() - failed.__len__()} succeeded, {failed.__len__() + failures.__len__()} failed, {monitor.pending.__len__()} running, {remaining.__len__()} waiting out of {total}")
+        failures.extend([logical_date for logical_date, future in futures.items() if future.exception()])
+        if failures:
+            raise Exception(f"Backfill of pipeline {DAG_ID} failed for logical dates {', '.join(sorted(failures))}")
+
 class AirflowTaskGroup(AbstractTaskGroup[TaskGroup]):
     def __init__(self, group_id: str, group: TaskGroup, **kwargs) -> None:
         super().__init__(group_id, orchestration_cls=AirflowOrchestration, group=group)
@@ -353,7 +606,7 @@ class AirflowOrchestration(AbstractOrchestration[DAG, BaseOperator, TaskGroup, D
         """
         if isinstance(native, TaskGroup):
             return AirflowTaskGroup(native.group_id, native)
-        elif isinstance(native, BaseOperator):
+        elif isinstance(native, (BaseOperator, MappedOperator)):
             return AbstractTask(native.task_id, native)
         else:
             return None
@@ -1 +1,2 @@
-# package ai
\ No newline at end of file
+# package ai
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
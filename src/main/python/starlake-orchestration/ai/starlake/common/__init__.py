@@ -4,7 +4,7 @@ from croniter import croniter
 from croniter.croniter import CroniterBadCronError
 
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 def keep_ascii_only(text):
     return re.sub(r'[^\x00-\x7F]+', '_', text)
@@ -159,6 +159,43 @@ def sl_scheduled_dataset(dataset: str, cron: Optional[str], ts: str, parameter_n
             raise e
     return sanitize_id(dataset).lower()
 
+def sl_cron_windows(crons: List[str], ts: str, format: str = sl_timestamp_format) -> dict:
+    """
+    Resolves at once the schedule windows of the cron expressions at the given timestamp, so that they can be shared by all the tasks of a dag run.
+    Args:
+        crons (List[str]): The cron expressions.
+        ts (str): The timestamp.
+        format (str): The format of the start and end dates. Defaults to '%Y-%m-%d %H:%M:%S%z'.
+    Returns:
+        dict: for each cron expression, its start and end dates as returned by sl_cron_start_end_dates, its current and previous schedules in iso format.
+    """
+    from dateutil import parser
+    import pytz
+    start_time = parser.isoparse(ts).astimezone(pytz.timezone('UTC'))
+    windows = dict()
+    for cron in set(crons):
+        if not is_valid_cron(cron):
+            raise ValueError(f"Invalid cron expression: {cron}")
+        windows[cron] = {
+            'sl_dates': sl_cron_start_end_dates(cron, start_time, format),
+            'current': croniter(cron, start_time).get_current(datetime).isoformat(),
+            'previous': croniter(cron, start_time).get_prev(datetime).isoformat(),
+        }
+    return windows
+
+def sl_window_dataset(dataset: str, window: Optional[str], parameter_name: str = 'sl_schedule', format: str = sl_timestamp_format) -> str:
+    """
+    Returns the dataset url with the schedule parameter set to an already resolved schedule, as returned by sl_cron_windows, if any.
+    Args:
+        dataset (str): The dataset name.
+        window (str): The optional schedule in iso format.
+        parameter_name (str): The parameter name. Defaults to 'sl_schedule'.
+        format (str): The format to return the schedule in. Defaults to '%Y-%m-%d %H:%M:%S%z'.
+    """
+    if window:
+        return f"{sanitize_id(dataset).lower()}{asQueryParameters({parameter_name: datetime.fromisoformat(window).strftime(format)})}"
+    return sanitize_id(dataset).lower()
+
 def is_valid_cron(cron_expr: str) -> bool:
     try:
         # Attempt to instantiate a croniter object
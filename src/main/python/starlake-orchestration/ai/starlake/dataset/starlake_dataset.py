@@ -44,7 +44,10 @@ class StarlakeDataset():
         self._sl_schedule_parameter_name = kwargs.get('sl_schedule_parameter_name', params.get('sl_schedule_parameter_name', 'sl_schedule'))
         self._sl_schedule_format = kwargs.get('sl_schedule_format', params.get('sl_schedule_format', sl_schedule_format))
         if cron is not None:
-            temp_parameters[self.sl_schedule_parameter_name] = sl_schedule(cron=cron, format=self.sl_schedule_format)
+            self._schedule = sl_schedule(cron=cron, format=self.sl_schedule_format)
+            temp_parameters[self.sl_schedule_parameter_name] = self._schedule
+        else:
+            self._schedule = None
         self._cron = cron
         self._queryParameters = asQueryParameters(temp_parameters)
         self._parameters = parameters
@@ -63,6 +66,11 @@ class StarlakeDataset():
     def uri(self) -> str:
         return self._uri
 
+    @property
+    def schedule(self) -> Optional[str]:
+        """The optional schedule of the dataset, computed from its cron when the dataset has been created or refreshed."""
+        return self._schedule
+
     @property
     def sl_schedule_parameter_name(self) -> str:
         return self._sl_schedule_parameter_name
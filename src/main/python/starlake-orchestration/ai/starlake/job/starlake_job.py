@@ -324,6 +324,36 @@ class IStarlakeJob(Generic[T, E], StarlakeOptions, AbstractEvent[E]):
             )
         return self.sl_job(task_id=task_id, arguments=arguments, spark_config=spark_config, dataset=dataset, **kwargs)
 
+    def sl_load_domain(self, task_id: str, domain: str, tables: List[str], datasets: Optional[List[Union[StarlakeDataset, str]]] = None, **kwargs) -> Optional[T]:
+        """Load domain job.
+        Generate a single scheduler task that will run the starlake `load` command for each table of the domain, if the job supports task mapping.
+
+        Args:
+            task_id (str): The optional task id.
+            domain (str): The required domain of the tables to load.
+            tables (List[str]): The required tables to load.
+            datasets (List[Union[StarlakeDataset, str]]): The optional datasets to materialize, one per table.
+
+        Returns:
+            Optional[T]: The scheduler task, or None if the tables have to be loaded by distinct tasks.
+        """
+        task_id = kwargs.get("task_id", f"load_{domain}") if not task_id else task_id
+        kwargs.pop("task_id", None)
+        if not datasets:
+            params: dict = kwargs.get('params', dict())
+            params.update({
+                'sl_schedule_parameter_name': self.sl_schedule_parameter_name, 
+                'sl_schedule_format': self.sl_schedule_format
+            })
+            kwargs['params'] = params
+            datasets = [StarlakeDataset(name=f'{domain}.{table}', **kwargs) for table in tables]
+        arguments = [["load", "--domains", domain, "--tables", table] for table in tables]
+        task = self.sl_job_mapped(task_id=task_id, arguments=arguments, datasets=datasets, **kwargs)
+        if task is not None:
+            for dataset in datasets:
+                self.__add_event(dataset, **kwargs)
+        return task
+
     def sl_transform(self, task_id: str, transform_name: str, transform_options: str=None, spark_config: Optional[StarlakeSparkConfig]=None, dataset: Optional[Union[StarlakeDataset, str]]= None, **kwargs) -> T:
         """Transform job.
         Generate the scheduler task that will run the starlake `transform` command.
@@ -399,6 +429,19 @@ class IStarlakeJob(Generic[T, E], StarlakeOptions, AbstractEvent[E]):
     def skip_or_start_op(self, task_id: str, upstream_task: T, **kwargs) -> Optional[T]:
         return None
 
+    def sl_job_mapped(self, task_id: str, arguments: List[list], datasets: List[Union[StarlakeDataset, str]], **kwargs) -> Optional[T]:
+        """Generate a single scheduler task that will run the starlake command once per list of arguments, if the job supports task mapping.
+
+        Args:
+            task_id (str): The required task id.
+            arguments (List[list]): The required arguments of each starlake command to run.
+            datasets (List[Union[StarlakeDataset, str]]): The datasets to materialize, one per command.
+
+        Returns:
+            Optional[T]: The scheduler task, or None if task mapping is not supported.
+        """
+        return None
+
     @abstractmethod
     def sl_job(self, task_id: str, arguments: list, spark_config: Optional[StarlakeSparkConfig]=None, dataset: Optional[Union[StarlakeDataset, str]]=None, **kwargs) -> T:
         """Generic job.
@@ -66,7 +66,14 @@ def main():
 
     options = parse_options(args.options) if args.options else {}
 
-    if isinstance(pipelines, list):
+    if isinstance(pipelines, list) and args.action == "deploy":
+        # deploy the pipelines of each orchestrator at once
+        pipelines_by_class = {}
+        for pipeline in pipelines:
+            pipelines_by_class.setdefault(type(pipeline), []).append(pipeline)
+        for pipeline_class, class_pipelines in pipelines_by_class.items():
+            pipeline_class.deploy_all(class_pipelines, **options)
+    elif isinstance(pipelines, list):
         for pipeline in pipelines:
             # Map the action to the corresponding method
             action_method = args.action.replace("-", "_")
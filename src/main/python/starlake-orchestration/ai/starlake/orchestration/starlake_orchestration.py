@@ -663,6 +663,33 @@ class AbstractPipeline(Generic[U, T, GT, E], AbstractTaskGroup[U], AbstractEvent
             self
         )
 
+    @final
+    def sl_load_domain(self, task_id: str, domain: str, tables: List[str], **kwargs) -> Optional[Union[AbstractTask[T], AbstractTaskGroup[GT]]]:
+        """Load all the tables of a domain within a single task, if the job supports task mapping.
+        Returns:
+            Optional[Union[AbstractTask[T], AbstractTaskGroup[GT]]]: the task, or None if the tables have to be loaded by distinct tasks.
+        """
+        params: dict = kwargs.get('params', dict())
+        params.update({
+            'cron': self.cron,
+            'sl_schedule_parameter_name': self.sl_schedule_parameter_name, 
+            'sl_schedule_format': self.sl_schedule_format
+        })
+        kwargs['params'] = params
+        kwargs.pop('spark_config', None)
+        kwargs.pop('datasets', None)
+        return self.orchestration.sl_create_task(
+            task_id, 
+            self.job.sl_load_domain(
+                task_id=task_id, 
+                domain=domain, 
+                tables=tables, 
+                datasets=[StarlakeDataset(f'{domain}.{table}', **kwargs) for table in tables],
+                **kwargs
+            ),
+            self
+        )
+
     @final
     def sl_transform(self, task_id: str, transform_name: str, **kwargs) -> Optional[Union[AbstractTask[T], AbstractTaskGroup[GT]]]:
         params: dict = kwargs.get('params', dict())
@@ -731,6 +758,15 @@ class AbstractPipeline(Generic[U, T, GT, E], AbstractTaskGroup[U], AbstractEvent
         """Deploy the pipeline."""
         ...
 
+    @classmethod
+    def deploy_all(cls, pipelines: List[AbstractPipeline], **kwargs) -> None:
+        """Deploy several pipelines of the same orchestrator, one at a time by default.
+        Args:
+            pipelines (List[AbstractPipeline]): the pipelines to deploy.
+        """
+        for pipeline in pipelines:
+            pipeline.deploy(**kwargs)
+
     @abstractmethod
     def run(self, logical_date: Optional[str] = None, timeout: str = '120', mode: StarlakeExecutionMode = StarlakeExecutionMode.RUN, **kwargs) -> None:
         """Run the pipeline.
@@ -780,10 +816,21 @@ class AbstractPipeline(Generic[U, T, GT, E], AbstractTaskGroup[U], AbstractEvent
         else:
             sl_end_date = previous
         sl_start_date: datetime = croniter(cron, sl_end_date).get_prev(datetime)
+        logical_dates = []
         while sl_start_date <= end_time:
-            self.run(logical_date= sl_start_date.isoformat(), timeout=timeout, **kwargs)
+            logical_dates.append(sl_start_date.isoformat())
             sl_end_date = croniter(cron, sl_end_date).get_next(datetime)
             sl_start_date = croniter(cron, sl_end_date).get_prev(datetime)
+        self.backfill_runs(logical_dates, timeout=timeout, **kwargs)
+
+    def backfill_runs(self, logical_dates: List[str], timeout: str = '120', **kwargs) -> None:
+        """Run the pipeline for each logical date to backfill, one at a time by default.
+        Args:
+            logical_dates (List[str]): the logical dates to backfill, in chronological order.
+            timeout (str): the timeout in seconds.
+        """
+        for logical_date in logical_dates:
+            self.run(logical_date=logical_date, timeout=timeout, **kwargs)
 
     @abstractmethod
     def delete(self, **kwargs) -> None:
@@ -1 +1,2 @@
-# package starlake
\ No newline at end of file
+# package starlake
+__path__ = __import__('pkgutil').extend_path(__path__, __name__)
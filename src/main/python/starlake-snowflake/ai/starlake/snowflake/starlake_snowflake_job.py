@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from ai.starlake.common import MissingEnvironmentVariable
 
@@ -34,6 +34,16 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
             self._sl_incoming_file_stage = kwargs.get('sl_incoming_file_stage', __class__.get_context_var(var_name='sl_incoming_file_stage', options=self.options))
         except MissingEnvironmentVariable:
             self._sl_incoming_file_stage = None
+        bind_variables = kwargs.get('bind_variables', __class__.get_context_var(var_name='bind_variables', default_value='sl_start_date,sl_end_date', options=self.options)).split(',')
+        self._bind_variables = sorted(set([variable.strip() for variable in bind_variables if variable.strip()]))
+        self._externalize_context = str(kwargs.get('externalize_context', __class__.get_context_var(var_name='externalize_context', default_value='false', options=self.options))).lower() in ['true', '1', 'yes', 'y']
+        self._context_artifact: Optional[Tuple[str, bytes]] = None
+        self._task_definitions: Dict[str, dict] = dict()
+        task_warehouses = kwargs.get('task_warehouses', __class__.get_context_var(var_name='task_warehouses', default_value='{}', options=self.options))
+        if isinstance(task_warehouses, str):
+            import json
+            task_warehouses = json.loads(task_warehouses or '{}')
+        self._task_warehouses: Dict[str, str] = {str(task).lower(): str(warehouse) for task, warehouse in task_warehouses.items()}
 
     @property
     def stage_location(self) -> Optional[str]:
@@ -55,6 +65,56 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
     def sl_incoming_file_stage(self) -> Optional[str]:
         return self._sl_incoming_file_stage
 
+    @property
+    def bind_variables(self) -> List[str]:
+        return self._bind_variables
+
+    @property
+    def externalize_context(self) -> bool:
+        return self._externalize_context
+
+    @property
+    def task_warehouses(self) -> Dict[str, str]:
+        return self._task_warehouses
+
+    def context_artifact(self) -> Optional[Tuple[str, bytes]]:
+        """Returns the content-addressed artifact holding the SQL context shared by all the tasks of the pipeline, if the context has to be externalized.
+        The artifact is a gzip compressed json document made of the statements, audit, expectations and expectation items.
+        It is written under the staging directory of the deployment and uploaded to the stage along with the pipeline.
+        The load context derived from json_context is not part of it: each load task only captures the context of its own sink,
+        whose schema, pattern and format are resolved while generating the task in order to build its COPY statements.
+
+        Returns:
+            Optional[Tuple[str, bytes]]: the path of the artifact relative to the stage location and its content.
+        """
+        if not self.externalize_context:
+            return None
+        if not self._context_artifact:
+            import gzip, hashlib, json
+            context = {
+                'statements': self.caller_globals.get('statements', dict()),
+                'audit': self.caller_globals.get('audit', dict()),
+                'expectations': self.caller_globals.get('expectations', dict()),
+                'expectation_items': self.caller_globals.get('expectation_items', dict()),
+            }
+            document = json.dumps(context, sort_keys=True).encode('utf-8')
+            sha = hashlib.sha256(document).hexdigest()
+            self._context_artifact = (f"sl_context/{sha}.json.gz", gzip.compress(document, mtime=0))
+        return self._context_artifact
+
+    def task_definition(self, task_id: str) -> Optional[dict]:
+        """Returns the explicit definition of a task generated by the job, used to fingerprint the task.
+        It is made of the command, the sink and the SQL context of the task as well as the options and the variables its stored procedure depends on,
+        whether its context has been externalized or not.
+
+        Args:
+            task_id (str): the id of the task.
+
+        Returns:
+            Optional[dict]: the json serializable definition of the task, if it has been generated by the job.
+        """
+        return self._task_definitions.get(task_id, None)
+
     @classmethod
     def sl_orchestrator(cls) -> Union[StarlakeOrchestrator, str]:
          return StarlakeOrchestrator.SNOWFLAKE
@@ -133,8 +193,13 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
         kwargs.pop('comment', None)
 
         def fun(session: Session, upstream_task_id: str) -> None:
-            from snowflake.core.task.context import TaskContext
-            context = TaskContext(session)
+            task_context = getattr(session, 'task_context', None)
+            if callable(task_context):
+                # the session provides its own task context, i.e the local session
+                context = task_context()
+            else:
+                from snowflake.core.task.context import TaskContext
+                context = TaskContext(session)
             return_value: str = context.get_predecessor_return_value(upstream_task_id)
             if return_value is None:
                 print(f"upstream task {upstream_task_id} did not return any value")
@@ -159,6 +224,8 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
             if failed:
                 raise ValueError(f"upstream task {upstream_task_id} failed")
 
+        self._task_definitions.update({task_id: {'command': 'skip_or_start', 'upstream_task': upstream_task.name}})
+
         return DAGTask(
             name=task_id, 
             definition=StoredProcedureCall(
@@ -254,6 +321,50 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
             expectation_items = self.caller_globals.get('expectation_items', dict()).get(sink, None)
             comment = kwargs.get('comment', f'Starlake {sink} task')
             kwargs.pop('comment', None)
+
+            context_path: Optional[str] = None # the path of the externalized context on the stage
+            artifact = self.context_artifact()
+            if artifact:
+                path, _ = artifact
+                context_path = f"@{self.stage_location}/{path}"
+
+            def load_context(session: Session) -> None:
+                """Load the externalized context of the task once, from the session, from the cache of the procedure or from the stage where it has been uploaded by the deployment.
+                The session may provide the contexts generated in-process by stage path (sl_local_contexts), i.e for a dry run of a pipeline that has not been deployed yet.
+                Args:
+                    session (Session): The Snowflake session.
+                """
+                nonlocal statements, audit, expectations, expectation_items
+                if context_path and statements is None:
+                    import gzip, json, os
+                    local_contexts: dict = getattr(session, 'sl_local_contexts', None) or dict()
+                    cached_context = os.path.join('/tmp', os.path.basename(context_path))
+                    if context_path in local_contexts:
+                        data = local_contexts[context_path]
+                    elif os.path.exists(cached_context):
+                        with open(cached_context, 'rb') as f:
+                            data = f.read()
+                    else:
+                        data = session.file.get_stream(context_path, decompress=False).read()
+                        try:
+                            with open(cached_context, 'wb') as f:
+                                f.write(data)
+                        except OSError:
+                            ... # the context will be loaded again from the stage
+                    context = json.loads(gzip.decompress(data).decode('utf-8'))
+                    statements = context.get('statements', dict()).get(sink, None)
+                    audit = context.get('audit', dict())
+                    expectations = context.get('expectations', dict())
+                    expectation_items = context.get('expectation_items', dict()).get(sink, None)
+
+            def release_context() -> None:
+                """Release the context captured by the task when it has been externalized, so that it is not serialized with the stored procedure."""
+                nonlocal statements, audit, expectations, expectation_items
+                if context_path:
+                    statements = None
+                    audit = None
+                    expectations = None
+                    expectation_items = None
             options = self.sl_env_vars.copy() # Copy the current sl env variables
             from collections import defaultdict
             safe_params = defaultdict(lambda: 'NULL', options)
@@ -269,14 +380,47 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                         })
                     break
 
-            def bindParams(stmt: str) -> str:
+            bind_variables = set(self.bind_variables)
+
+            task_definition = {'command': command, 'sink': sink, 'statements': statements, 'audit': audit, 'expectations': expectations, 'expectation_items': expectation_items, 'options': options, 'bind_variables': sorted(bind_variables)}
+            self._task_definitions.update({task_id: task_definition})
+
+            import re
+            # the statements accepting bind variables, once their leading comments and parentheses are skipped
+            bindable_statement = re.compile(r"^(?:\s|--[^\n]*(?:\n|$)|/\*.*?\*/|\()*(?:SELECT|WITH|INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE | re.DOTALL)
+
+            def bindParams(stmt: str) -> Tuple[str, List[str]]:
                 """Bind parameters to the SQL statement.
+                Quoted placeholders of the bind variables (i.e '{sl_start_date}') are replaced by bind variables (?)
+                so that the statement text remains the same between runs, all other placeholders are substituted.
+                Only queries and DML statements accept bind variables, the placeholders of any other statement (i.e DDL, CTAS or COPY) are substituted.
                 Args:
                     stmt (str): The SQL statement.
                 Returns:
-                    str: The SQL statement with the parameters bound
+                    Tuple[str, List[str]]: The SQL statement with the parameters bound and the values of its bind variables
                 """
-                return stmt.format_map(safe_params)
+                if not bind_variables or '?' in stmt or not bindable_statement.match(stmt):
+                    return stmt.format_map(safe_params), []
+                import string
+                parts: List[Tuple[str, Optional[str], Optional[str], Optional[str]]] = list(string.Formatter().parse(stmt))
+                bound: List[str] = []
+                params: List[str] = []
+                quoted = False # whether the current literal text starts with the closing quote of a bind variable
+                for index, (literal_text, field_name, format_spec, conversion) in enumerate(parts):
+                    if quoted:
+                        literal_text = literal_text[1:]
+                        quoted = False
+                    next_literal_text = parts[index + 1][0] if index + 1 < parts.__len__() else ''
+                    if field_name in bind_variables and not format_spec and not conversion and literal_text.endswith("'") and next_literal_text.startswith("'"):
+                        bound.append(literal_text[:-1].replace('{', '{{').replace('}', '}}'))
+                        bound.append('?')
+                        params.append(str(safe_params[field_name]))
+                        quoted = True
+                    else:
+                        bound.append(literal_text.replace('{', '{{').replace('}', '}}'))
+                        if field_name is not None:
+                            bound.append('{' + field_name + (f'!{conversion}' if conversion else '') + (f':{format_spec}' if format_spec else '') + '}')
+                return ''.join(bound).format_map(safe_params), params
 
             def str_to_bool(value: str) -> bool:
                 """Convert a string to a boolean.
@@ -311,20 +455,54 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                 if sql:
                     if dry_run and message:
                         print(f"-- {message}")
-                    stmt: str = bindParams(sql)
                     if dry_run:
+                        stmt: str = sql.format_map(safe_params)
                         print(f"{stmt};")
                         return []
                     else:
+                        stmt, params = bindParams(sql)
                         try:
-                            df: DataFrame = session.sql(stmt)
+                            if params:
+                                df: DataFrame = session.sql(stmt, params=params)
+                            else:
+                                df: DataFrame = session.sql(stmt)
                             rows = df.collect()
                             return rows
                         except Exception as e:
-                            raise Exception(f"Error executing SQL {stmt}: {str(e)}")
+                            raise Exception(f"Error executing SQL {stmt} with params {params}: {str(e)}")
                 else:
                     return []
 
+            def stream_sql(session: Session, sql: Optional[str], message: Optional[str] = None, dry_run: bool = False) -> Iterator[Row]:
+                """Execute the SQL and stream the resulting rows instead of materializing all of them.
+                Args:
+                    session (Session): The Snowflake session.
+                    sql (str): The SQL query to execute.
+                    message (Optional[str], optional): The optional message. Defaults to None.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                Returns:
+                    Iterator[Row]: The rows.
+                """
+                if sql:
+                    if dry_run and message:
+                        print(f"-- {message}")
+                    if dry_run:
+                        stmt: str = sql.format_map(safe_params)
+                        print(f"{stmt};")
+                        return iter([])
+                    else:
+                        stmt, params = bindParams(sql)
+                        try:
+                            if params:
+                                df: DataFrame = session.sql(stmt, params=params)
+                            else:
+                                df: DataFrame = session.sql(stmt)
+                            return df.to_local_iterator()
+                        except Exception as e:
+                            raise Exception(f"Error executing SQL {stmt} with params {params}: {str(e)}")
+                else:
+                    return iter([])
+
             def execute_sqls(session: Session, sqls: List[str], message: Optional[str] = None, dry_run: bool = False) -> None:
                 """Execute the SQLs.
                 Args:
@@ -348,8 +526,15 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     Returns:
                     bool: True if the table exists, False otherwise.
                 """
-                query=f"SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE CONCAT(TABLE_SCHEMA, '.', TABLE_NAME) ILIKE '{domain}.{table}'"
-                return execute_sql(session, query, f"Check if table {domain}.{table} exists:", False).__len__() > 0
+                query=f"SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE CONCAT(TABLE_SCHEMA, '.', TABLE_NAME) ILIKE '{domain}.{table}'"
+                return next(stream_sql(session, query, f"Check if table {domain}.{table} exists:", False), None) is not None
+
+            # the audit and expectations records are buffered during the task and flushed at commit or rollback
+            audit_sink: dict = {'audit': [], 'expectations': [], 'checked': dict()}
+
+            def reset_audit_sink() -> None:
+                """Reset the buffered audit and expectations records as well as the tables already checked."""
+                audit_sink.update({'audit': [], 'expectations': [], 'checked': dict()})
 
             def check_if_audit_table_exists(session: Session, dry_run: bool = False) -> bool:
                 """Check if the audit table exists.
@@ -359,6 +544,19 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     bool: True if the audit table exists, False otherwise.
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
                 """
+                checked: dict = audit_sink['checked']
+                if 'audit' not in checked:
+                    checked['audit'] = create_audit_table_if_not_exists(session, dry_run)
+                return checked['audit']
+
+            def create_audit_table_if_not_exists(session: Session, dry_run: bool = False) -> bool:
+                """Create the audit table if it does not exist.
+                Args:
+                    session (Session): The Snowflake session.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                Returns:
+                    bool: True if the audit table exists, False otherwise.
+                """
                 if audit:
                     try:
                         # create SQL domain
@@ -389,6 +587,19 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     bool: True if the expectations table exists, False otherwise.
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
                 """
+                checked: dict = audit_sink['checked']
+                if 'expectations' not in checked:
+                    checked['expectations'] = create_expectations_table_if_not_exists(session, dry_run)
+                return checked['expectations']
+
+            def create_expectations_table_if_not_exists(session: Session, dry_run: bool = False) -> bool:
+                """Create the expectations table if it does not exist.
+                Args:
+                    session (Session): The Snowflake session.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                Returns:
+                    bool: True if the expectations table exists, False otherwise.
+                """
                 if expectations:
                     try:
                         # create SQL domain
@@ -409,8 +620,41 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
 
             from datetime import datetime
 
+            def audit_record(paths: Optional[str], count: int, countAccepted: int, countRejected: int, success: bool, duration: int, message: str, ts: datetime, jobid: Optional[str] = None, step: Optional[str] = None) -> dict:
+                """Build the audit record.
+                Args:
+                    paths (Optional[str]): The optional paths.
+                    count (int): The count.
+                    countAccepted (int): The count accepted.
+                    countRejected (int): The count rejected.
+                    success (bool): The success.
+                    duration (int): The duration.
+                    message (str): The message.
+                    ts (datetime): The timestamp.
+                    jobid (Optional[str], optional): The optional job id. Defaults to None.
+                    step (Optional[str], optional): The optional step. Defaults to None.
+                Returns:
+                    dict: The audit record.
+                """
+                return {
+                    'jobid': jobid or f'{domain}.{table}',
+                    'paths': paths or table,
+                    'domain': domain,
+                    'schema': table,
+                    'success': str(success),
+                    'count': str(count),
+                    'countAccepted': str(countAccepted),
+                    'countRejected': str(countRejected),
+                    'timestamp': ts.strftime("%Y-%m-%d %H:%M:%S"),
+                    'duration': str(duration),
+                    'message': message,
+                    'step': step or "TRANSFORM",
+                    'database': "",
+                    'tenant': ""
+                }
+
             def log_audit(session: Session, paths: Optional[str], count: int, countAccepted: int, countRejected: int, success: bool, duration: int, message: str, ts: datetime, jobid: Optional[str] = None, step: Optional[str] = None, dry_run: bool = False) -> bool :
-                """Log the audit record.
+                """Log the audit record. The record is buffered and will be inserted when the audit sink is flushed.
                 Args:
                     session (Session): The Snowflake session.
                     count (int): The count.
@@ -426,43 +670,15 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                 Returns:
                     bool: True if the audit record was logged, False otherwise.
                 """
-                if audit and check_if_audit_table_exists(session, dry_run):
-                    audit_domain = audit.get('domain', ['audit'])[0]
-                    audit_sqls = audit.get('mainSqlIfExists', None)
-                    if audit_sqls:
-                        try:
-                            audit_sql = audit_sqls[0]
-                            formatted_sql = audit_sql.format(
-                                jobid = jobid or f'{domain}.{table}',
-                                paths = paths or table,
-                                domain = domain,
-                                schema = table,
-                                success = str(success),
-                                count = str(count),
-                                countAccepted = str(countAccepted),
-                                countRejected = str(countRejected),
-                                timestamp = ts.strftime("%Y-%m-%d %H:%M:%S"),
-                                duration = str(duration),
-                                message = message,
-                                step = step or "TRANSFORM",
-                                database = "",
-                                tenant = ""
-                            )
-                            insert_sql = f"INSERT INTO {audit_domain}.audit {formatted_sql}"
-                            execute_sql(session, insert_sql, "Insert audit record:", dry_run)
-                            return True
-                        except Exception as e:
-                            print(f"Error inserting audit record: {str(e)}")
-                            return False
-                    else:
-                        return False
+                if audit and audit.get('mainSqlIfExists', None):
+                    audit_sink['audit'].append(audit_record(paths, count, countAccepted, countRejected, success, duration, message, ts, jobid, step))
+                    return True
                 else:
                     return False
 
-            def log_expectation(session: Session, success: bool, name: str, params: str, sql: str, count: int, exception: str, ts: datetime, jobid: Optional[str] = None, dry_run: bool = False) -> bool :
-                """Log the expectation record.
+            def expectation_record(success: bool, name: str, params: str, sql: str, count: int, exception: str, ts: datetime, jobid: Optional[str] = None) -> dict:
+                """Build the expectation record.
                 Args:
-                    session (Session): The Snowflake session.
                     success (bool): whether the expectation has been successfully checked or not.
                     name (str): The name of the expectation.
                     params (str): The params for the expectation.
@@ -471,41 +687,78 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     exception (str): The exception.
                     ts (datetime): The timestamp.
                     jobid (Optional[str], optional): The optional job id. Defaults to None.
+                Returns:
+                    dict: The expectation record.
+                """
+                return {
+                    'jobid': jobid or f'{domain}.{table}',
+                    'database': "",
+                    'domain': domain,
+                    'schema': table,
+                    'count': count,
+                    'exception': exception,
+                    'timestamp': ts.strftime("%Y-%m-%d %H:%M:%S"),
+                    'success': str(success),
+                    'name': name,
+                    'params': params,
+                    'sql': sql
+                }
+
+            def log_expectations(session: Session, records: List[dict], dry_run: bool = False) -> bool :
+                """Log the expectation records. The records are buffered and will be inserted when the audit sink is flushed.
+                Args:
+                    session (Session): The Snowflake session.
+                    records (List[dict]): The expectation records.
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
                 Returns:
-                    bool: True if the expectation record was logged, False otherwise.
+                    bool: True if the expectation records were logged, False otherwise.
                 """
-                if expectations and check_if_expectations_table_exists(session, dry_run):
-                    expectation_domain = expectations.get('domain', ['audit'])[0]
-                    expectation_sqls = expectations.get('mainSqlIfExists', None)
-                    if expectation_sqls:
-                        try:
-                            expectation_sql = expectation_sqls[0]
-                            formatted_sql = expectation_sql.format(
-                                jobid = jobid or f'{domain}.{table}',
-                                database = "",
-                                domain = domain,
-                                schema = table,
-                                count = count,
-                                exception = exception,
-                                timestamp = ts.strftime("%Y-%m-%d %H:%M:%S"),
-                                success = str(success),
-                                name = name,
-                                params = params,
-                                sql = sql
-                            )
-                            insert_sql = f"INSERT INTO {expectation_domain}.expectations {formatted_sql}"
-                            execute_sql(session, insert_sql, "Insert expectations record:", dry_run)
-                            return True
-                        except Exception as e:
-                            print(f"Error inserting expectations record: {str(e)}")
-                            return False
-                    else:
+                if records and expectations and expectations.get('mainSqlIfExists', None):
+                    audit_sink['expectations'].extend(records)
+                    return True
+                else:
+                    return False
+
+            def insert_records(session: Session, statements: dict, table_name: str, records: List[dict], dry_run: bool = False) -> bool:
+                """Insert the records using a single multi-row insert.
+                Args:
+                    session (Session): The Snowflake session.
+                    statements (dict): The audit or expectations statements.
+                    table_name (str): The name of the table within the audit domain.
+                    records (List[dict]): The records to insert.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                Returns:
+                    bool: True if the records were inserted, False otherwise.
+                """
+                sqls = statements.get('mainSqlIfExists', None)
+                if records and sqls:
+                    try:
+                        target_domain = statements.get('domain', ['audit'])[0]
+                        formatted_sqls = [sqls[0].format(**record) for record in records]
+                        insert_sql = f"INSERT INTO {target_domain}.{table_name} {' UNION ALL '.join(formatted_sqls)}"
+                        execute_sql(session, insert_sql, f"Insert {records.__len__()} {table_name} record(s):", dry_run)
+                        return True
+                    except Exception as e:
+                        print(f"Error inserting {table_name} records: {str(e)}")
                         return False
                 else:
                     return False
 
-            def run_expectation(session: Session, name: str, params: str, query: str, failOnError: bool = False, jobid: Optional[str] = None, dry_run: bool = False) -> None:
+            def flush_audit_sink(session: Session, dry_run: bool = False) -> None:
+                """Flush the buffered expectations and audit records, each kind of record being inserted with a single statement.
+                Args:
+                    session (Session): The Snowflake session.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                """
+                expectation_records: List[dict] = audit_sink['expectations']
+                audit_records: List[dict] = audit_sink['audit']
+                audit_sink.update({'audit': [], 'expectations': []})
+                if expectation_records and check_if_expectations_table_exists(session, dry_run):
+                    insert_records(session, expectations, 'expectations', expectation_records, dry_run)
+                if audit_records and check_if_audit_table_exists(session, dry_run):
+                    insert_records(session, audit, 'audit', audit_records, dry_run)
+
+            def run_expectation(session: Session, name: str, params: str, query: str, failOnError: bool = False, jobid: Optional[str] = None, dry_run: bool = False, count: Optional[int] = None) -> None:
                 """Run the expectation.
                 Args:
                     session (Session): The Snowflake session.
@@ -515,28 +768,60 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     failOnError (bool, optional): Whether to fail on error. Defaults to False.
                     jobid (Optional[str], optional): The optional job id. Defaults to None.
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                    count (Optional[int], optional): The count already computed by a merged scan, if any. Defaults to None.
                 """
-                count = 0
+                computed = count is not None
+                if not computed:
+                    count = 0
                 try:
                     if query:
-                        rows = execute_sql(session, query, f"Run expectation {name}:", dry_run)
-                        if rows.__len__() != 1:
-                            if not dry_run:
-                                raise Exception(f'Expectation failed for {sink}: {query}. Expected 1 row but got {rows.__len__()}')
-                        else:
-                            count = rows[0][0]
+                        if not computed:
+                            rows = execute_sql(session, query, f"Run expectation {name}:", dry_run)
+                            if rows.__len__() != 1:
+                                if not dry_run:
+                                    raise Exception(f'Expectation failed for {sink}: {query}. Expected 1 row but got {rows.__len__()}')
+                            else:
+                                count = rows[0][0]
                         #  log expectations as audit in expectation table here
                         if count != 0:
                             raise Exception(f'Expectation failed for {sink}: {query}. Expected count to be equal to 0 but got {count}')
-                        log_expectation(session, True, name, params, query, count, "", datetime.now(), jobid, dry_run)
+                        log_expectations(session, [expectation_record(True, name, params, query, count, "", datetime.now(), jobid)], dry_run)
                     else:
                         raise Exception(f'Expectation failed for {sink}: {name}. Query not found')
                 except Exception as e:
                     print(f"Error running expectation {name}: {str(e)}")
-                    log_expectation(session, False, name, params, query, count, str(e), datetime.now(), jobid, dry_run)
+                    log_expectations(session, [expectation_record(False, name, params, query, count, str(e), datetime.now(), jobid)], dry_run)
                     if failOnError and not dry_run:
                         raise e
 
+            def run_merged_expectations(session: Session, queries: List[Tuple[int, str]], dry_run: bool = False) -> dict:
+                """Run all the expectation queries within a single scan, one column per expectation.
+                Each expectation query is expected to return a single row with a single count column, so that it may be used as a scalar subquery.
+                Args:
+                    session (Session): The Snowflake session.
+                    queries (List[Tuple[int, str]]): The expectation queries indexed by their position.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                Returns:
+                    dict: The counts indexed by the position of the expectation - expectations whose count could not be computed are missing.
+                """
+                counts = dict()
+                if queries.__len__() > 1:
+                    columns = [f"({query.strip().rstrip(';')}) AS expectation_{index}" for index, query in queries]
+                    merged_query = f"SELECT {', '.join(columns)}"
+                    try:
+                        rows = execute_sql(session, merged_query, f"Run {queries.__len__()} merged expectations:", dry_run)
+                        if dry_run:
+                            return {index: 0 for index, _ in queries}
+                        elif rows.__len__() == 1:
+                            row = rows[0]
+                            for position, (index, _) in enumerate(queries):
+                                if row[position] is not None:
+                                    counts[index] = row[position]
+                    except Exception as e:
+                        # one of the queries is not compatible with a merged scan, each expectation will be run individually
+                        print(f"Error running merged expectations: {str(e)}")
+                return counts
+
             def run_expectations(session: Session, jobid: Optional[str] = None, dry_run: bool = False) -> None:
                 """Run the expectations.
                 Args:
@@ -545,16 +830,19 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
                 """
                 if expectation_items and check_if_expectations_table_exists(session, dry_run):
-                    for expectation in expectation_items:
-                        run_expectation(session, expectation.get("name", None), expectation.get("params", None), expectation.get("query", None), str_to_bool(expectation.get('failOnError', 'no')), jobid, dry_run)
+                    queries = [(index, expectation.get("query")) for index, expectation in enumerate(expectation_items) if expectation.get("query", None)]
+                    counts = run_merged_expectations(session, queries, dry_run)
+                    for index, expectation in enumerate(expectation_items):
+                        run_expectation(session, expectation.get("name", None), expectation.get("params", None), expectation.get("query", None), str_to_bool(expectation.get('failOnError', 'no')), jobid, dry_run, counts.get(index, None))
 
-            def begin_transaction(session: Session, dry_run: bool = False) -> None:
+            def begin_transaction(session: Session, dry_run: bool = False, query_tag: Optional[str] = None) -> None:
                 """Begin the transaction.
                 Args:
                     session (Session): The Snowflake session.
                     dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                    query_tag (Optional[str], optional): The optional comment tagging the statement, as returned by query_tag_comment. Defaults to None.
                 """
-                execute_sql(session, "BEGIN", "BEGIN transaction:", dry_run)
+                execute_sql(session, f"BEGIN {query_tag}" if query_tag else "BEGIN", "BEGIN transaction:", dry_run)
 
             def create_domain_if_not_exists(session: Session, domain: str, dry_run: bool = False) -> None:
                 """Create the schema if it does not exist.
@@ -590,11 +878,60 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                 """
                 execute_sql(session, "ROLLBACK", "ROLLBACK transaction:", dry_run)
 
+            def get_task_runtime_info(session: Session, dry_run: bool = False, with_schedule: bool = True) -> dict:
+                """Retrieve with a single query the name of the current task, the configuration of the task graph
+                and the original scheduled timestamp of the initial graph run in the current group.
+                The schedule window is derived locally from them: the root task can not publish it to the tasks which are not its direct successors,
+                and the configuration of the task graph can not be updated during a run, so no other lookup is required.
+                Args:
+                    session (Session): The Snowflake session.
+                    dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                    with_schedule (bool, optional): Whether the configuration and the original scheduled timestamp are required, only the task name being retrieved otherwise. Defaults to True.
+                Returns:
+                    dict: The task name, the task graph configuration and the original scheduled timestamp.
+                """
+                if dry_run:
+                    return {'task_name': sink, 'config': {}, 'original_schedule': None}
+                if not with_schedule:
+                    task_name = session.call("system$current_user_task_name")
+                    return {'task_name': str(task_name or sink), 'config': {}, 'original_schedule': None}
+                query = "SELECT system$current_user_task_name() AS task_name, system$get_task_graph_config() AS config, to_timestamp(system$task_runtime_info('CURRENT_TASK_GRAPH_ORIGINAL_SCHEDULED_TIMESTAMP')) AS original_schedule"
+                rows = execute_sql(session, query, "Get the task runtime info", dry_run)
+                if rows.__len__() == 1:
+                    task_name, config, original_schedule = rows[0][0], rows[0][1], rows[0][2]
+                else:
+                    task_name, config, original_schedule = None, None, None
+                if config:
+                    import json
+                    config = json.loads(config)
+                else:
+                    config = {}
+                return {'task_name': str(task_name or sink), 'config': config, 'original_schedule': original_schedule}
+
+            def query_tag_comment(jobid: str) -> str:
+                """Returns the comment tagging the statement beginning the transaction of the task with the pipeline, the task and the schedule window.
+                The session of the task being tagged with the pipeline and the task by the QUERY_TAG session parameter of the task,
+                the window is attributed to all the queries of the session by the SnowflakeQueryHistoryCollector.
+                Only one statement is tagged, so that the text of the other statements remains the same between runs,
+                while ALTER SESSION may not be used within owner's rights procedures.
+                Args:
+                    jobid (str): The job id, i.e the full name of the task.
+                Returns:
+                    str: The comment, whose braces are escaped since the statement will be formatted.
+                """
+                import json
+                tag = {'pipeline': jobid.split('$')[0], 'task': jobid, 'sink': sink}
+                for key in ['sl_start_date', 'sl_end_date']:
+                    if key in safe_params:
+                        tag.update({key: safe_params[key]})
+                return f"/* sl_query_tag={json.dumps(tag)} */".replace('{', '{{').replace('}', '}}')
+
             if command == 'transform':
                 if statements:
 
                     cron_expr = kwargs.get('cron_expr', None)
                     kwargs.pop('cron_expr', None)
+                    task_definition.update({'cron_expr': cron_expr})
 
                     format = '%Y-%m-%d %H:%M:%S%z'
 
@@ -602,32 +939,20 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                     def fun(session: Session, dry_run: bool) -> None:
                         from datetime import datetime
 
+                        load_context(session)
+
                         if dry_run:
                             print(f"--Executing transform for {sink} in dry run mode")
 
+                        runtime_info = get_task_runtime_info(session, dry_run, with_schedule=bool(cron_expr))
+                        jobid = runtime_info['task_name']
+
                         if cron_expr:
                             from croniter import croniter
                             from croniter.croniter import CroniterBadCronError
-                            # get the original scheduled timestamp of the initial graph run in the current group
+                            # the original scheduled timestamp of the initial graph run in the current group
                             # For graphs that are retried, the returned value is the original scheduled timestamp of the initial graph run in the current group.
-                            if dry_run:
-                                config = None
-                            else:
-                                config = session.call("system$get_task_graph_config")
-                            if config:
-                                import json
-                                config = json.loads(config)
-                            else:
-                                config = {}
-                            original_schedule = config.get("logical_date", None)
-                            if not original_schedule:
-                                query = "SELECT to_timestamp(system$task_runtime_info('CURRENT_TASK_GRAPH_ORIGINAL_SCHEDULED_TIMESTAMP'))"
-                                print(f"--Get the original scheduled timestamp of the initial graph run:\n{query};")
-                                rows = execute_sql(session, query, "Get the original scheduled timestamp of the initial graph run", dry_run)
-                                if rows.__len__() == 1:
-                                    original_schedule = rows[0][0]
-                                else:
-                                    original_schedule = None
+                            original_schedule = runtime_info['config'].get("logical_date", None) or runtime_info['original_schedule']
                             if original_schedule:
                                 if isinstance(original_schedule, str):
                                     from dateutil import parser
@@ -638,11 +963,11 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                 start_time = datetime.fromtimestamp(datetime.now().timestamp())
                             try:
                                 croniter(cron_expr)
-                                iter = croniter(cron_expr, start_time)
-                                curr = iter.get_current(datetime)
-                                previous = iter.get_prev(datetime)
-                                next = croniter(cron_expr, previous).get_next(datetime)
-                                if curr == next :
+                                cron_iter = croniter(cron_expr, start_time)
+                                curr = cron_iter.get_current(datetime)
+                                previous = cron_iter.get_prev(datetime)
+                                next_run = croniter(cron_expr, previous).get_next(datetime)
+                                if curr == next_run :
                                     sl_end_date = curr
                                 else:
                                     sl_end_date = previous
@@ -651,16 +976,15 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                             except CroniterBadCronError:
                                 raise ValueError(f"Invalid cron expression: {cron_expr}")
 
-                        if dry_run:
-                            jobid = sink
-                        else:
-                            jobid = str(session.call("system$current_user_task_name"))
+                        query_tag = query_tag_comment(jobid)
+
+                        reset_audit_sink()
 
                         start = datetime.now()
 
                         try:
                             # BEGIN transaction
-                            begin_transaction(session, dry_run)
+                            begin_transaction(session, dry_run, query_tag)
 
                             # create SQL domain
                             create_domain_if_not_exists(session, domain, dry_run)
@@ -696,6 +1020,8 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                             duration = (end - start).total_seconds()
                             print(f"--Duration in seconds: {duration}")
                             log_audit(session, None, -1, -1, -1, True, duration, 'Success', end, jobid, "TRANSFORM", dry_run)
+                            # flush the buffered expectations and audit records
+                            flush_audit_sink(session, dry_run)
                             
                         except Exception as e:
                             # ROLLBACK transaction
@@ -706,11 +1032,15 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                             duration = (end - start).total_seconds()
                             print(f"Duration in seconds: {duration}")
                             log_audit(session, None, -1, -1, -1, False, duration, error_message, end, jobid, "TRANSFORM", dry_run)
+                            # flush the buffered expectations and audit records
+                            flush_audit_sink(session, dry_run)
                             raise e
 
                     kwargs.pop('params', None)
                     kwargs.pop('events', None)
 
+                    release_context()
+
                     return DAGTask(
                         name=task_id, 
                         definition=StoredProcedureCall(
@@ -745,6 +1075,7 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                         else:
                             format = format.upper()
                         metadata_options: dict = metadata.get("options", dict())
+                        task_definition.update({'temp_stage': temp_stage, 'context': context})
 
                         def get_option(key: str, metadata_key: Optional[str]) -> Optional[str]:
                             if metadata_options and key.lower() in metadata_options:
@@ -758,31 +1089,38 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                 return default
                             return value.lower() == "true"
 
-                        def get_audit_info(rows: List[Row]) -> Tuple[str, str, str, int, int, int]:
-                            if rows.__len__() == 0:
+                        def get_audit_info(rows: Iterable[Row]) -> Tuple[str, str, str, int, int, int]:
+                            """Aggregate the COPY results incrementally.
+                            Args:
+                                rows (Iterable[Row]): The rows returned by the COPY statement.
+                            Returns:
+                                Tuple[str, str, str, int, int, int]: The files, first error lines, first error column names, rows parsed, rows loaded and errors seen.
+                            """
+                            files = []
+                            first_error_lines = []
+                            first_error_column_names = []
+                            rows_parsed = 0
+                            rows_loaded = 0
+                            errors_seen = 0
+                            empty = True
+                            for row in rows:
+                                empty = False
+                                row_dict = row.as_dict()
+                                file = row_dict.get('file', None)
+                                if file:
+                                    files.append(file)
+                                first_error_line=row_dict.get('first_error_line', None)
+                                if first_error_line:
+                                    first_error_lines.append(first_error_line)
+                                first_error_column_name=row_dict.get('first_error_column_name', None)
+                                if first_error_column_name:
+                                    first_error_column_names.append(first_error_column_name)
+                                rows_parsed += row_dict.get('rows_parsed', 0)
+                                rows_loaded += row_dict.get('rows_loaded', 0)
+                                errors_seen += row_dict.get('errors_seen', 0)
+                            if empty:
                                 return '', '', '', -1, -1, -1
-                            else:
-                                files = []
-                                first_error_lines = []
-                                first_error_column_names = []
-                                rows_parsed = 0
-                                rows_loaded = 0
-                                errors_seen = 0
-                                for row in rows:
-                                    row_dict = row.as_dict()
-                                    file = row_dict.get('file', None)
-                                    if file:
-                                        files.append(file)
-                                    first_error_line=row_dict.get('first_error_line', None)
-                                    if first_error_line:
-                                        first_error_lines.append(first_error_line)
-                                    first_error_column_name=row_dict.get('first_error_column_name', None)
-                                    if first_error_column_name:
-                                        first_error_column_names.append(first_error_column_name)
-                                    rows_parsed += row_dict.get('rows_parsed', 0)
-                                    rows_loaded += row_dict.get('rows_loaded', 0)
-                                    errors_seen += row_dict.get('errors_seen', 0)
-                                return ','.join(files), ','.join(first_error_lines), ','.join(first_error_column_names), rows_parsed, rows_loaded, errors_seen
+                            return ','.join(files), ','.join(first_error_lines), ','.join(first_error_column_names), rows_parsed, rows_loaded, errors_seen
 
                         def copy_extra_options(common_options: list[str]):
                             extra_options = ""
@@ -793,49 +1131,112 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                             return extra_options
 
                         def schema_as_dict(schema_string: str) -> dict:
-                            tableNativeSchema = map(lambda x: (x.split()[0].strip(), x.split()[1].strip()), schema_string.replace("\"", "").split(","))
+                            # split the columns on the commas which are not part of a type definition such as NUMBER(38,9)
+                            columns = []
+                            depth = 0
+                            current = ''
+                            for c in schema_string.replace("\"", ""):
+                                if c == '(':
+                                    depth += 1
+                                elif c == ')':
+                                    depth -= 1
+                                if c == ',' and depth == 0:
+                                    columns.append(current)
+                                    current = ''
+                                else:
+                                    current += c
+                            columns.append(current)
+                            tableNativeSchema = [(column.split(None, 1)[0].strip(), column.split(None, 1)[1].strip()) for column in columns if column.strip()]
                             tableSchemaDict = dict(map(lambda x: (x[0].lower(), x[1].lower()), tableNativeSchema))
                             return tableSchemaDict
 
-                        def add_columns_from_dict(dictionary: dict):
-                            return [f"ALTER TABLE IF EXISTS {domain}.{table} ADD COLUMN IF NOT EXISTS {k} {v};" for k, v in dictionary.items()]
-    
-                        def drop_columns_from_dict(dictionary: dict):
-                            # In the current version, we do not drop any existing columns for backward compatibility
-                            # return [f"ALTER TABLE IF EXISTS {domain}.{table} DROP COLUMN IF EXISTS {k};" for k, v in dictionary.items()]
-                            return []    
+                        # the columns of the table retrieved from the information schema, cached during the load
+                        table_columns: dict = dict()
+
+                        def get_table_columns(session: Session) -> dict:
+                            """Retrieve the columns of the table with their data type, length, precision and scale, using a single cached query.
+                            Args:
+                                session (Session): The Snowflake session.
+                            Returns:
+                                dict: The columns of the table by lower case name, empty if the table does not exist.
+                            """
+                            if 'columns' not in table_columns:
+                                existing_schema_sql = f"select column_name, data_type, character_maximum_length, numeric_precision, numeric_scale from information_schema.columns where table_schema ilike '{domain}' and table_name ilike '{table}';"
+                                rows = stream_sql(session, existing_schema_sql, f"Retrieve existing schema for {domain}.{table}", False)
+                                table_columns['columns'] = {str(row[0]).lower(): (str(row[1]).lower(), row[2], row[3], row[4]) for row in rows}
+                            return table_columns['columns']
+
+                        def invalidate_table_columns() -> None:
+                            """Invalidate the cached columns of the table."""
+                            table_columns.clear()
+
+                        def table_exists(session: Session) -> bool:
+                            """Check if the table exists using its cached columns.
+                            Args:
+                                session (Session): The Snowflake session.
+                            Returns:
+                                bool: True if the table exists, False otherwise.
+                            """
+                            return get_table_columns(session).__len__() > 0
+
+                        def widened_type(existing: Tuple[str, Optional[int], Optional[int], Optional[int]], new_type: str) -> Optional[str]:
+                            """Returns the new type of the column if it widens its existing type, None otherwise.
+                            Only the length of text columns and the precision of numbers with the same scale may be widened.
+                            """
+                            import re
+                            data_type, length, precision, scale = existing
+                            match = re.fullmatch(r"\s*(\w+)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?\s*", new_type)
+                            if not match:
+                                return None
+                            name, first, second = match.group(1).lower(), match.group(2), match.group(3)
+                            if data_type == 'text' and name in ['varchar', 'string', 'text', 'char', 'character', 'nchar', 'nvarchar']:
+                                new_length = int(first) if first else 16777216
+                                if length is not None and new_length > int(length):
+                                    return f"VARCHAR({new_length})"
+                            elif data_type == 'number' and name in ['number', 'numeric', 'decimal', 'int', 'integer', 'bigint', 'smallint', 'tinyint', 'byteint']:
+                                new_precision = int(first) if first else 38
+                                new_scale = int(second) if second else 0
+                                if precision is not None and new_precision > int(precision) and new_scale == int(scale or 0):
+                                    return f"NUMBER({new_precision},{new_scale})"
+                            return None
 
                         def update_table_schema(session: Session, dry_run: bool) -> bool:
-                            existing_schema_sql = f"select column_name, data_type from information_schema.columns where table_schema ilike '{domain}' and table_name ilike '{table}';"
-                            rows = execute_sql(session, existing_schema_sql, f"Retrieve existing schema for {domain}.{table}", False)
-                            existing_columns = []
-                            for row in rows:
-                                existing_columns.append((str(row[0]).lower(), str(row[1]).lower()))
-                            existing_schema = dict(existing_columns)
+                            existing_columns = get_table_columns(session)
+                            existing_schema = {key: value[0] for key, value in existing_columns.items()}
                             if dry_run:
                                 print(f"-- Existing schema for {domain}.{table}: {existing_schema}")
                             schema_string = statements.get("schemaString", "") 
                             if schema_string.strip() == "":
                                 return False
                             new_schema = schema_as_dict(schema_string)
-                            new_columns = set(new_schema.keys()) - set(existing_schema.keys())
-                            old_columns = set(existing_schema.keys()) - set(new_schema.keys())
-                            nb_new_columns = new_columns.__len__()
-                            nb_old_columns = old_columns.__len__()
-                            update_required = nb_new_columns + nb_old_columns > 0
-                            if not update_required:
+                            new_columns = [key for key in new_schema.keys() if key not in existing_schema]
+                            widened_columns = dict()
+                            for key, new_type in new_schema.items():
+                                if key in existing_columns:
+                                    widened = widened_type(existing_columns[key], new_type)
+                                    if widened:
+                                        widened_columns.update({key: widened})
+                            if not new_columns and not widened_columns:
                                 if dry_run:
                                     print(f"-- No schema update required for {domain}.{table}")
                                 return False
-                            new_columns_dict = {key: new_schema[key] for key in new_columns}
-                            old_columns_dict = {key: existing_schema[key] for key in old_columns}
-                            alter_columns = add_columns_from_dict(new_columns_dict)
-                            execute_sqls(session, alter_columns, "Add columns", dry_run)
-
-                            old_columns_dict = {key: existing_schema[key] for key in old_columns}
-                            drop_columns = drop_columns_from_dict(old_columns_dict)
-                            execute_sqls(session, drop_columns, "Drop columns", dry_run)
-
+                            alter_statements = []
+                            if new_columns:
+                                # add all the new columns with a single statement
+                                added_columns = ', '.join([f"{key} {new_schema[key]}" for key in new_columns])
+                                alter_statements.append(f"ALTER TABLE IF EXISTS {domain}.{table} ADD COLUMN IF NOT EXISTS {added_columns}")
+                            if widened_columns:
+                                # widen all the columns with a single statement
+                                altered_columns = ', '.join([f"COLUMN {key} SET DATA TYPE {value}" for key, value in widened_columns.items()])
+                                alter_statements.append(f"ALTER TABLE IF EXISTS {domain}.{table} ALTER {altered_columns}")
+                            if alter_statements.__len__() == 1:
+                                execute_sql(session, alter_statements[0], "Update schema", dry_run)
+                            else:
+                                # add and widen the columns within a single request
+                                block = '\n'.join([f"  {statement};" for statement in alter_statements])
+                                execute_sql(session, f"EXECUTE IMMEDIATE $$\nBEGIN\n{block}\nEND;\n$$", "Update schema", dry_run)
+                            # In the current version, we do not drop any existing columns for backward compatibility
+                            invalidate_table_columns()
                             return True
 
                         compression = is_true(get_option("compression", None), True)
@@ -944,26 +1345,84 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                             elif format == 'JSON':
                                 return build_copy_json()
                             elif format == 'PARQUET':
-                                return build_copy_other()
+                                return build_copy_other(format)
                             elif format == 'XML':
-                                return build_copy_other()
+                                return build_copy_other(format)
                             else:
                                 raise ValueError(f"Unsupported format {format}")
   
+                        def list_stage_files(session: Session, dry_run: bool = False) -> Optional[List[str]]:
+                            """List the files of the domain within the incoming stage.
+                            The files are listed by each load, right before its transaction, so that the files which have just landed or which have been purged are taken into account.
+                            Args:
+                                session (Session): The Snowflake session.
+                                dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                            Returns:
+                                Optional[List[str]]: The files or None if they could not be listed.
+                            """
+                            stage_path = f"@{temp_stage}/{domain}/"
+                            try:
+                                files = [str(row[0]) for row in stream_sql(session, f"LIST {stage_path}", f"List files of {stage_path}", dry_run)]
+                            except Exception as e:
+                                print(f"Error listing files of {stage_path}: {str(e)}")
+                                return None
+                            if dry_run:
+                                return None
+                            return files
+
+                        def has_files_to_load(session: Session, dry_run: bool = False) -> bool:
+                            """Check whether at least one file of the incoming stage matches the pattern of the table.
+                            Args:
+                                session (Session): The Snowflake session.
+                                dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+                            Returns:
+                                bool: False if no file matches the pattern, True otherwise or if it could not be determined.
+                            """
+                            files = list_stage_files(session, dry_run)
+                            if files is None:
+                                return True
+                            import re
+                            try:
+                                extension = ".gz" if format == 'DSV' and compression else ""
+                                regex = re.compile(f"{pattern}{extension}".format_map(safe_params))
+                            except Exception:
+                                return True
+                            for file in files:
+                                # the file path may be prefixed by the stage location
+                                parts = file.split('/')
+                                if any([regex.fullmatch('/'.join(parts[index:])) for index in range(parts.__len__())]):
+                                    return True
+                            return False
+
                         # create the function that will execute the load
                         def fun(session: Session, dry_run: bool) -> None:
                             from datetime import datetime
 
-                            if dry_run:
-                                jobid = sink
-                            else:
-                                jobid = str(session.call("system$current_user_task_name"))
+                            load_context(session)
+
+                            jobid = get_task_runtime_info(session, dry_run, with_schedule=False)['task_name']
+
+                            query_tag = query_tag_comment(jobid)
+
+                            reset_audit_sink()
+                            invalidate_table_columns()
 
                             start = datetime.now()
 
+                            if not has_files_to_load(session, dry_run):
+                                # no file to load, the load is skipped
+                                message = f"No file matching {pattern} found in @{temp_stage}/{domain}/"
+                                print(message)
+                                end = datetime.now()
+                                duration = (end - start).total_seconds()
+                                log_audit(session, None, 0, 0, 0, True, duration, f"Skipped: {message}", end, jobid, "LOAD", dry_run)
+                                # flush the buffered audit records
+                                flush_audit_sink(session, dry_run)
+                                return
+
                             try:
                                 # BEGIN transaction
-                                begin_transaction(session, dry_run)
+                                begin_transaction(session, dry_run, query_tag)
 
                                 nbSteps = int(statements.get('steps', '1'))
                                 write_strategy = statements.get('writeStrategy', None)
@@ -972,7 +1431,7 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                     execute_sqls(session, context_schema.get('presql', []), "Pre sqls", dry_run)
                                     # create table
                                     execute_sqls(session, statements.get('createTable', []), "Create table", dry_run)
-                                    exists = check_if_table_exists(session, domain, table)
+                                    exists = table_exists(session)
                                     if exists:
                                         # enable change tracking
                                         enable_change_tracking(session, sink, dry_run)
@@ -983,8 +1442,8 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                         execute_sql(session, f"TRUNCATE TABLE {sink}", "Truncate table", dry_run)
                                     # create stage if not exists
                                     execute_sql(session, f"CREATE STAGE IF NOT EXISTS {temp_stage}", "Create stage", dry_run)
-                                    # copy data
-                                    copy_results = execute_sql(session, build_copy(), "Copy data", dry_run)
+                                    # copy data and aggregate the results while streaming them
+                                    audit_info = get_audit_info(stream_sql(session, build_copy(), "Copy data", dry_run))
                                     if not exists:
                                         # enable change tracking
                                         enable_change_tracking(session, sink, dry_run)
@@ -996,18 +1455,19 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                         execute_sql(session, f"TRUNCATE TABLE {sink}", "Truncate table", dry_run)
                                     # create stage if not exists
                                     execute_sql(session, f"CREATE STAGE IF NOT EXISTS {temp_stage}", "Create stage", dry_run)
-                                    # copy data
-                                    copy_results = execute_sql(session, build_copy(), "Copy data", dry_run)
+                                    # copy data and aggregate the results while streaming them
+                                    audit_info = get_audit_info(stream_sql(session, build_copy(), "Copy data", dry_run))
                                     second_step = statements.get('secondStep', dict())
                                     # execute preActions
                                     execute_sqls(session, second_step.get('preActions', []), "Pre actions", dry_run)
                                     # execute schema presql
                                     execute_sqls(session, context_schema.get('presql', []), "Pre sqls", dry_run)
-                                    if check_if_table_exists(session, domain, table):
+                                    if table_exists(session):
                                         # enable change tracking
                                         enable_change_tracking(session, sink, dry_run)
                                         # execute addSCD2ColumnsSqls
                                         execute_sqls(session, second_step.get('addSCD2ColumnsSqls', []), "Add SCD2 columns", dry_run)
+                                        invalidate_table_columns()
                                         # update schema
                                         update_table_schema(session, dry_run)
                                         # execute mainSqlIfExists
@@ -1033,10 +1493,12 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                 end = datetime.now()
                                 duration = (end - start).total_seconds()
                                 print(f"--Duration in seconds: {duration}")
-                                files, first_error_line, first_error_column_name, rows_parsed, rows_loaded, errors_seen = get_audit_info(copy_results)
+                                files, first_error_line, first_error_column_name, rows_parsed, rows_loaded, errors_seen = audit_info
                                 message = first_error_line + '\n' + first_error_column_name
                                 success = errors_seen == 0
                                 log_audit(session, files, rows_parsed, rows_loaded, errors_seen, success, duration, message, end, jobid, "LOAD", dry_run)
+                                # flush the buffered expectations and audit records
+                                flush_audit_sink(session, dry_run)
                                 
                             except Exception as e:
                                 # ROLLBACK transaction
@@ -1047,11 +1509,15 @@ class StarlakeSnowflakeJob(IStarlakeJob[DAGTask, StarlakeDataset], StarlakeOptio
                                 duration = (end - start).total_seconds()
                                 print(f"Duration in seconds: {duration}")
                                 log_audit(session, None, -1, -1, -1, False, duration, error_message, end, jobid, "LOAD", dry_run)
+                                # flush the buffered expectations and audit records
+                                flush_audit_sink(session, dry_run)
                                 raise e
 
                         kwargs.pop('params', None)
                         kwargs.pop('events', None)
 
+                        release_context()
+
                         return DAGTask(
                             name=task_id, 
                             definition=StoredProcedureCall(
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import inspect
+import io
+import json
+import re
+import sqlite3
+import time
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Pattern, Tuple, Union
+
+class LocalRow(tuple):
+    """A row returned by the local session, mimicking the Snowpark Row."""
+    def __new__(cls, values: Union[tuple, list], fields: List[str]) -> LocalRow:
+        row = super().__new__(cls, tuple(values))
+        row._fields = list(fields)
+        return row
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.as_dict()[key]
+        return super().__getitem__(key)
+
+    def as_dict(self) -> dict:
+        return dict(zip(self._fields, self))
+
+class LocalAsyncJob:
+    """An asynchronous job of the local session, which has already been executed."""
+    def __init__(self, rows: List[LocalRow]) -> None:
+        self._rows = rows
+
+    def is_done(self) -> bool:
+        return True
+
+    def result(self) -> List[LocalRow]:
+        return self._rows
+
+class LocalDataFrame:
+    """The result of a SQL statement submitted to the local session, executed lazily like the Snowpark DataFrame."""
+    def __init__(self, session: LocalSession, query: str, params: Optional[List[Any]] = None) -> None:
+        self._session = session
+        self._query = query
+        self._params = params
+
+    def collect(self) -> List[LocalRow]:
+        return self._session._execute(self._query, self._params)
+
+    def collect_nowait(self) -> LocalAsyncJob:
+        return LocalAsyncJob(self.collect())
+
+    def to_local_iterator(self) -> Iterator[LocalRow]:
+        return iter(self.collect())
+
+class LocalFileOperation:
+    """The files of the stages of the local session."""
+    def __init__(self, session: LocalSession) -> None:
+        self._session = session
+
+    def put_stream(self, input_stream: io.IOBase, stage_location: str, auto_compress: bool = True, overwrite: bool = False, **kwargs) -> None:
+        self._session._round_trip(f"PUT {stage_location}")
+        path = stage_location.lstrip('@').lower()
+        if overwrite or path not in self._session.stage_files:
+            self._session.stage_files.update({path: input_stream.read()})
+
+    def get_stream(self, stage_location: str, decompress: bool = False, **kwargs) -> io.BytesIO:
+        self._session._round_trip(f"GET {stage_location}")
+        path = stage_location.lstrip('@').lower()
+        if path not in self._session.stage_files:
+            raise FileNotFoundError(f"File {stage_location} not found")
+        return io.BytesIO(self._session.stage_files[path])
+
+class LocalTaskContext:
+    """A minimal stand-in of snowflake.core.task.context.TaskContext backed by the local session."""
+    def __init__(self, session: LocalSession) -> None:
+        self._session = session
+
+    def get_current_task_name(self) -> str:
+        return self._session.call("system$current_user_task_name")
+
+    def get_task_graph_config(self) -> Optional[dict]:
+        config = self._session.call("system$get_task_graph_config")
+        return json.loads(config) if config else None
+
+    def get_task_graph_config_property(self, property_name: str) -> Any:
+        return (self.get_task_graph_config() or dict()).get(property_name, None)
+
+    def set_return_value(self, value: Any) -> None:
+        self._session.call("system$set_return_value", value)
+
+    def get_predecessor_return_value(self, task_name: Optional[str] = None) -> Optional[str]:
+        return self._session.call("system$get_predecessor_return_value", task_name)
+
+    def get_current_task_graph_original_schedule(self) -> datetime:
+        return self._session.original_schedule
+
+class LocalSession:
+    """A local stand-in of the Snowpark Session backed by SQLite, in order to run and time the generated procedures without a Snowflake account.
+    Each schema is an attached in-memory SQLite database, the statements specific to Snowflake are answered by responders,
+    and each round trip may be delayed to simulate the network latency. The round trips are recorded per task.
+    """
+    def __init__(self, latency: Union[float, Callable[[str], float]] = 0.0, strict: bool = False, config: Optional[dict] = None, original_schedule: Optional[datetime] = None, stage_files: Optional[Dict[str, bytes]] = None, copy_results: Optional[Callable[[str], List[dict]]] = None) -> None:
+        """Initialize the local session.
+        Args:
+            latency (Union[float, Callable[[str], float]]): the latency in seconds injected for each round trip, or a function of the statement returning it. Defaults to 0.
+            strict (bool): whether the statements that can not be executed locally should raise an error instead of returning no rows. Defaults to False.
+            config (Optional[dict]): the optional task graph configuration.
+            original_schedule (Optional[datetime]): the original scheduled timestamp of the task graph run. Defaults to now.
+            stage_files (Optional[Dict[str, bytes]]): the files of the stages by path (i.e stage/domain/file.csv).
+            copy_results (Optional[Callable[[str], List[dict]]]): an optional function returning the results of a COPY statement. Defaults to loading the matching CSV files of the stage into the table.
+        """
+        self.latency = latency
+        self.strict = strict
+        self.config = config or dict()
+        self.original_schedule = original_schedule or datetime.now()
+        self.stage_files: Dict[str, bytes] = {key.lower(): value for key, value in (stage_files or dict()).items()}
+        self.copy_results = copy_results
+        self.custom_package_usage_config: dict = dict()
+        self.file = LocalFileOperation(self)
+        self.current_task: Optional[str] = None
+        self.return_values: Dict[str, Any] = dict()
+        self.round_trips: Dict[str, int] = defaultdict(int)
+        self.statements: Dict[str, List[str]] = defaultdict(list)
+        self.unsupported: List[str] = []
+        self._connection = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+        self._schemas = set()
+        self._responders: List[Tuple[Pattern, Callable[[re.Match, Optional[List[Any]]], List[LocalRow]]]] = []
+        self._register_default_responders()
+
+    def respond(self, pattern: str, responder: Callable[[re.Match, Optional[List[Any]]], Union[List[LocalRow], List[dict]]]) -> None:
+        """Register a responder for the statements matching the pattern, the last registered responders taking precedence.
+        Args:
+            pattern (str): the case insensitive regular expression searched within the statement.
+            responder (Callable): the function returning the rows, as LocalRow or dict, for the match and the bound parameters.
+        """
+        self._responders.insert(0, (re.compile(pattern, re.IGNORECASE | re.DOTALL), responder))
+
+    def sql(self, query: str, params: Optional[List[Any]] = None) -> LocalDataFrame:
+        return LocalDataFrame(self, query, params)
+
+    def call(self, sproc_name: str, *args) -> Any:
+        self._round_trip(f"CALL {sproc_name}")
+        name = sproc_name.lower()
+        if name == 'system$current_user_task_name':
+            return self.current_task
+        elif name == 'system$get_task_graph_config':
+            return json.dumps(self.config) if self.config else None
+        elif name == 'system$set_return_value':
+            self.return_values.update({self.current_task or '': args[0] if args else None})
+            return None
+        elif name == 'system$get_predecessor_return_value':
+            task_name = str(args[0]).lower() if args and args[0] else ''
+            # the predecessor may be identified by its name or by its full name
+            for key, value in self.return_values.items():
+                if key.lower() == task_name or key.lower().endswith(f"${task_name}"):
+                    return value
+            return None
+        elif name == 'system$task_runtime_info':
+            return self.original_schedule.isoformat()
+        raise NotImplementedError(f"Procedure {sproc_name} is not supported locally")
+
+    def task_context(self) -> LocalTaskContext:
+        """Returns the task context of the current task, used by the procedures instead of snowflake.core.task.context.TaskContext."""
+        return LocalTaskContext(self)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of round trips per task."""
+        return dict(self.round_trips)
+
+    def _round_trip(self, statement: str) -> None:
+        self.round_trips[self.current_task or ''] += 1
+        self.statements[self.current_task or ''].append(statement)
+        latency = self.latency(statement) if callable(self.latency) else self.latency
+        if latency and latency > 0:
+            time.sleep(latency)
+
+    def _execute(self, query: str, params: Optional[List[Any]] = None) -> List[LocalRow]:
+        statement = query.strip().rstrip(';').strip()
+        self._round_trip(statement)
+        return self._run(statement, params)
+
+    def _run(self, statement: str, params: Optional[List[Any]] = None) -> List[LocalRow]:
+        for pattern, responder in self._responders:
+            match = pattern.search(statement)
+            if match:
+                rows = responder(match, params) or []
+                return [row if isinstance(row, LocalRow) else LocalRow(list(row.values()), list(row.keys())) for row in rows]
+        try:
+            cursor = self._connection.execute(statement, params or [])
+            fields = [description[0] for description in cursor.description or []]
+            return [LocalRow(values, fields) for values in cursor.fetchall()]
+        except sqlite3.Error as e:
+            if self.strict:
+                raise Exception(f"Error executing SQL {statement}: {str(e)}")
+            self.unsupported.append(statement)
+            return []
+
+    def _attach(self, schema: str) -> None:
+        schema = schema.lower()
+        if schema not in self._schemas and schema != 'main':
+            self._connection.execute(f"ATTACH DATABASE ':memory:' AS {schema}")
+            self._schemas.add(schema)
+
+    def _tables(self) -> List[Tuple[str, str]]:
+        tables = []
+        for schema in self._schemas:
+            for (name,) in self._connection.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'").fetchall():
+                tables.append((schema, name))
+        return tables
+
+    def _register_default_responders(self) -> None:
+        def like(value: str, pattern: str) -> bool:
+            return re.fullmatch(re.escape(pattern.lower()).replace('%', '.*').replace('_', '.'), value.lower()) is not None
+
+        def no_rows(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            return []
+
+        def create_schema(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            self._attach(match.group(1))
+            return [LocalRow([f"Schema {match.group(1).upper()} successfully created."], ['status'])]
+
+        def create_or_replace_table(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            name = match.group(1)
+            if '.' in name:
+                self._attach(name.split('.')[0])
+            self._connection.execute(f"DROP TABLE IF EXISTS {name}")
+            self._connection.execute(f"CREATE TABLE {name} {match.group(2)}", params or [])
+            return []
+
+        def create_table(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            name = match.group(1)
+            if '.' in name:
+                self._attach(name.split('.')[0])
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {name} {match.group(2)}", params or [])
+            return []
+
+        def information_schema_tables(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            return [LocalRow([name.upper()], ['TABLE_NAME']) for schema, name in self._tables() if like(f"{schema}.{name}", match.group(1))]
+
+        def information_schema_columns(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            rows = []
+            for schema, name in self._tables():
+                if like(schema, match.group(1)) and like(name, match.group(2)):
+                    for column in self._connection.execute(f"PRAGMA {schema}.table_info({name})").fetchall():
+                        data_type = str(column[2] or 'text').lower()
+                        type_match = re.fullmatch(r"\s*(\w+)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?\s*", data_type)
+                        base, first, second = (type_match.group(1), type_match.group(2), type_match.group(3)) if type_match else (data_type, None, None)
+                        if base in ['varchar', 'string', 'text', 'char']:
+                            rows.append(LocalRow([column[1].upper(), 'TEXT', int(first) if first else 16777216, None, None], ['COLUMN_NAME', 'DATA_TYPE', 'CHARACTER_MAXIMUM_LENGTH', 'NUMERIC_PRECISION', 'NUMERIC_SCALE']))
+                        elif base in ['number', 'numeric', 'decimal', 'int', 'integer', 'bigint']:
+                            rows.append(LocalRow([column[1].upper(), 'NUMBER', None, int(first) if first else 38, int(second) if second else 0], ['COLUMN_NAME', 'DATA_TYPE', 'CHARACTER_MAXIMUM_LENGTH', 'NUMERIC_PRECISION', 'NUMERIC_SCALE']))
+                        else:
+                            rows.append(LocalRow([column[1].upper(), base.upper(), None, None, None], ['COLUMN_NAME', 'DATA_TYPE', 'CHARACTER_MAXIMUM_LENGTH', 'NUMERIC_PRECISION', 'NUMERIC_SCALE']))
+            return rows
+
+        def task_runtime_info(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            return [LocalRow([self.current_task, json.dumps(self.config) if self.config else None, self.original_schedule], ['TASK_NAME', 'CONFIG', 'ORIGINAL_SCHEDULE'])]
+
+        def original_schedule(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            return [LocalRow([self.original_schedule], ['ORIGINAL_SCHEDULE'])]
+
+        def list_stage(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            prefix = match.group(1).strip().lower().rstrip('/')
+            return [LocalRow([path, len(data), '', ''], ['name', 'size', 'md5', 'last_modified']) for path, data in self.stage_files.items() if path.startswith(f"{prefix}/") or path == prefix]
+
+        def copy_into(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            if self.copy_results:
+                return [LocalRow(list(result.values()), list(result.keys())) for result in self.copy_results(match.group(0))]
+            statement = match.string
+
+            def option(name: str) -> Optional[str]:
+                option_match = re.search(rf"\b{name}\s*=\s*(?:'((?:[^'\\]|\\.)*)'|(\w+))", statement, re.IGNORECASE)
+                if not option_match:
+                    return None
+                return option_match.group(1) if option_match.group(1) is not None else option_match.group(2)
+
+            # only the CSV files of the stage are loaded locally
+            if (option('TYPE') or '').upper() != 'CSV':
+                return []
+            import csv
+            table = match.group(1)
+            prefix = match.group(2).strip().lower().rstrip('/')
+            pattern = option('PATTERN')
+            regex = re.compile(pattern) if pattern else None
+            skip_header = int(option('SKIP_HEADER') or 0)
+            delimiter = option('FIELD_DELIMITER') or ','
+            quote = option('FIELD_OPTIONALLY_ENCLOSED_BY') or ''
+            results = []
+            for path, data in list(self.stage_files.items()):
+                if not path.startswith(f"{prefix}/"):
+                    continue
+                parts = path.split('/')
+                if regex and not any([regex.fullmatch('/'.join(parts[index:])) for index in range(parts.__len__())]):
+                    continue
+                rows = list(csv.reader(io.StringIO(data.decode('utf-8')), delimiter=delimiter, quotechar=quote if quote.__len__() == 1 else '"'))[skip_header:]
+                rows = [[value if value != '' else None for value in row] for row in rows if row]
+                for row in rows:
+                    self._connection.execute(f"INSERT INTO {table} VALUES ({', '.join(['?'] * row.__len__())})", row)
+                if (option('PURGE') or '').upper() == 'TRUE':
+                    self.stage_files.pop(path)
+                results.append({'file': path, 'status': 'LOADED', 'rows_parsed': rows.__len__(), 'rows_loaded': rows.__len__(), 'errors_seen': 0, 'first_error_line': None, 'first_error_column_name': None})
+            return [LocalRow(list(result.values()), list(result.keys())) for result in results] or [LocalRow(['Copy executed with 0 files processed.'], ['status'])]
+
+        def anonymous_block(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            # the statements of the block are run within the same round trip
+            for statement in match.group(1).split(';'):
+                if statement.strip():
+                    self._run(statement.strip(), params)
+            return []
+
+        def current_epoch(match: re.Match, params: Optional[List[Any]]) -> List[LocalRow]:
+            return [LocalRow([int(time.time())], ['EPOCH'])]
+
+        for pattern in [r"^ALTER\s+SESSION\b", r"^USE\s+", r"^SHOW\s+", r"^ALTER\s+TABLE\s+\S+\s+SET\s+CHANGE_TRACKING", r"^CREATE\s+STAGE\b", r"^ALTER\s+TASK\b", r"^TRUNCATE\s+TABLE\b"]:
+            self.respond(pattern, no_rows)
+        self.respond(r"^CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", create_schema)
+        self.respond(r"^CREATE\s+OR\s+REPLACE\s+(?:TRANSIENT\s+|TEMPORARY\s+)?TABLE\s+([\w.]+)\s*(\(.*\)|AS\s+.*)$", create_or_replace_table)
+        self.respond(r"^CREATE\s+(?:TRANSIENT\s+|TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)\s*(\(.*\)|AS\s+.*)$", create_table)
+        self.respond(r"INFORMATION_SCHEMA\.TABLES\s+WHERE\s+CONCAT\(TABLE_SCHEMA,\s*'\.',\s*TABLE_NAME\)\s+ILIKE\s+'([^']+)'", information_schema_tables)
+        self.respond(r"information_schema\.columns\s+where\s+table_schema\s+ilike\s+'([^']+)'\s+and\s+table_name\s+ilike\s+'([^']+)'", information_schema_columns)
+        self.respond(r"system\$task_runtime_info\('CURRENT_TASK_GRAPH_ORIGINAL_SCHEDULED_TIMESTAMP'\)", original_schedule)
+        self.respond(r"system\$current_user_task_name\(\)", task_runtime_info)
+        self.respond(r"^LIST\s+@(\S+)", list_stage)
+        self.respond(r"^COPY\s+INTO\s+([\w.]+)\s+FROM\s+@(\S+)", copy_into)
+        self.respond(r"DATE_PART\(EPOCH_SECOND,\s*CURRENT_TIMESTAMP\(\)\)", current_epoch)
+        self.respond(r"^EXECUTE\s+IMMEDIATE\s+\$\$\s*BEGIN\s+(.*?)\s*END\s*;?\s*\$\$$", anonymous_block)
+
+def run_pipeline_locally(pipeline, session: Optional[LocalSession] = None, dry_run: bool = False) -> Dict[str, dict]:
+    """Run the stored procedures of a Snowflake pipeline against a local session, the root first and then its tasks in topological order.
+    Args:
+        pipeline (SnowflakePipeline): the pipeline to run.
+        session (Optional[LocalSession]): the optional local session. Defaults to a new local session.
+        dry_run (bool): whether to run the procedures in dry run mode. Defaults to False.
+    Returns:
+        Dict[str, dict]: the duration in seconds, the number of round trips and the optional error of each task by task name.
+    """
+    from snowflake.core.task import StoredProcedureCall
+    from ai.starlake.snowflake.starlake_snowflake_job import StarlakeSnowflakeJob
+
+    session = session or LocalSession()
+    job = pipeline.job
+    artifact = job.context_artifact() if isinstance(job, StarlakeSnowflakeJob) else None
+    if artifact:
+        # the externalized context is uploaded to the stage as it would be by the deployment
+        path, data = artifact
+        session.stage_files.setdefault(f"{job.stage_location}/{path}".lower(), data)
+    dag = pipeline.dag
+    tasks = [(dag.name, dag.definition)]
+    done = set()
+    remaining = list(dag.tasks)
+    while remaining:
+        ready = [task for task in remaining if all([predecessor.full_name in done for predecessor in task.predecessors])]
+        if not ready:
+            raise ValueError("There is a cycle in the task graph.")
+        for task in ready:
+            tasks.append((task.full_name, task.definition))
+            done.add(task.full_name)
+        remaining = [task for task in remaining if task.full_name not in done]
+
+    results: Dict[str, dict] = dict()
+    for name, definition in tasks:
+        session.current_task = name
+        start = time.perf_counter()
+        error = None
+        if isinstance(definition, StoredProcedureCall) and callable(definition.func):
+            try:
+                if 'dry_run' in inspect.signature(definition.func).parameters:
+                    definition.func(session, dry_run=dry_run)
+                else:
+                    definition.func(session, *(definition._args or []))
+            except Exception as e:
+                error = str(e)
+        else:
+            session._execute(str(definition))
+        results.update({name: {'duration': time.perf_counter() - start, 'round_trips': session.round_trips[name], 'error': error}})
+    session.current_task = None
+    return results
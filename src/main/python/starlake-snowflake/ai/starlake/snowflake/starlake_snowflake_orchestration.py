@@ -10,15 +10,20 @@ from ai.starlake.snowflake.starlake_snowflake_job import StarlakeSnowflakeJob
 from snowflake.core import Root
 from snowflake.core._common import CreateMode
 from snowflake.core.task import Cron, StoredProcedureCall, Task
-from snowflake.core.task.dagv1 import DAG, DAGTask, DAGOperation, DAGRun, _dag_context_stack
+from snowflake.core.task.dagv1 import DAG, DAGTask, DAGOperation, _dag_context_stack
 from snowflake.snowpark import Row, Session
 
-from typing import Any, Callable, List, Optional, Union
+from typing import Any, Callable, Iterator, List, Optional, Union
 
 from types import ModuleType
 
 from datetime import timedelta
 
+def _fingerprint(*parts: Any) -> str:
+    """Returns the sha256 fingerprint of the json representation of the parts."""
+    import hashlib, json
+    return hashlib.sha256(json.dumps(list(parts), sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
 class SnowflakeDag(DAG):
     def __init__(
         self,
@@ -116,6 +121,27 @@ class SnowflakeDag(DAG):
             else:
                 return []
 
+        def stream_sql(session: Session, query: Optional[str], message: Optional[str] = None, dry_run: bool = False) -> Iterator[Row]:
+            """Execute the SQL and stream the resulting rows instead of materializing all of them.
+            Args:
+                session (Session): The Snowflake session.
+                query (str): The SQL query to execute.
+                message (Optional[str], optional): The optional message. Defaults to None.
+                dry_run (bool, optional): Whether to run in dry run mode. Defaults to False.
+            Returns:
+                Iterator[Row]: The rows.
+            """
+            if query:
+                if dry_run and message:
+                    print(f"-- {message}")
+                if dry_run:
+                    print(f"{query};")
+                    return iter([])
+                else:
+                    return session.sql(query).to_local_iterator()
+            else:
+                return iter([])
+
         format = '%Y-%m-%d %H:%M:%S%z'
 
         def fun(session: Session, dry_run: bool) -> None:
@@ -123,13 +149,19 @@ class SnowflakeDag(DAG):
             from croniter.croniter import CroniterBadCronError
             from datetime import datetime
 
+            if dry_run:
+                print("-- SL_START")
+
+            if not changes:
+                # no dataset to check, the schedule window being resolved by each transform along with its runtime info
+                return
+
             # get the original scheduled timestamp of the initial graph run in the current group
             # For graphs that are retried, the returned value is the original scheduled timestamp of the initial graph run in the current group.
             if not dry_run:
                 config = session.call("system$get_task_graph_config")
             else:
                 config = None
-                print("-- SL_START")
             if config:
                 import json
                 config = json.loads(config)
@@ -153,31 +185,31 @@ class SnowflakeDag(DAG):
                 start_time = datetime.fromtimestamp(datetime.now().timestamp())
 
             def check_if_dataset_exists(dataset: str) -> bool:
-                query = f"SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE CONCAT(TABLE_SCHEMA, '.', TABLE_NAME) ILIKE '{dataset}'"
-                rows = execute_sql(session, query, f"Checking if dataset {dataset} exists", dry_run)
+                query = f"SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE CONCAT(TABLE_SCHEMA, '.', TABLE_NAME) ILIKE '{dataset}'"
+                rows = stream_sql(session, query, f"Checking if dataset {dataset} exists", dry_run)
                 if dry_run:
                     return True
                 else:
-                    return rows.__len__() > 0
+                    return next(rows, None) is not None
 
-            for dataset, cron_expr in changes.items():
+            for dataset, dataset_cron in changes.items():
                 if not check_if_dataset_exists(dataset):
                     raise ValueError(f"Dataset {dataset} does not exist")
                 try:
                     # enabling change tracking for the dataset - should be done once and when we create our datasets
                     query = f"ALTER TABLE {dataset} SET CHANGE_TRACKING = TRUE"
                     execute_sql(session, query, f"Enabling change tracking for dataset {dataset}", dry_run)
-                    croniter(cron_expr)
-                    iter = croniter(cron_expr, start_time)
+                    croniter(dataset_cron)
+                    cron_iter = croniter(dataset_cron, start_time)
                     # get the start and end date of the current cron iteration
-                    curr = iter.get_current(datetime)
-                    previous = iter.get_prev(datetime)
-                    next = croniter(cron_expr, previous).get_next(datetime)
-                    if curr == next :
+                    curr = cron_iter.get_current(datetime)
+                    previous = cron_iter.get_prev(datetime)
+                    next_run = croniter(dataset_cron, previous).get_next(datetime)
+                    if curr == next_run :
                         sl_end_date = curr
                     else:
                         sl_end_date = previous
-                    sl_start_date = croniter(cron_expr, sl_end_date).get_prev(datetime)
+                    sl_start_date = croniter(dataset_cron, sl_end_date).get_prev(datetime)
                     change = f"SELECT count(*) FROM {dataset} CHANGES(INFORMATION => DEFAULT) AT(TIMESTAMP => '{sl_start_date.strftime(format)}') END (TIMESTAMP => '{sl_end_date.strftime(format)}')"
                     rows = execute_sql(session, change, f"Checking changes for dataset {dataset} from {sl_start_date.strftime(format)} to {sl_end_date.strftime(format)}", dry_run)
                     if rows:
@@ -191,7 +223,7 @@ class SnowflakeDag(DAG):
                             raise ValueError(error)
                     print(f"Dataset {dataset} has data from {sl_start_date.strftime(format)} to {sl_end_date.strftime(format)}")
                 except CroniterBadCronError:
-                    raise ValueError(f"Invalid cron expression: {cron_expr}")
+                    raise ValueError(f"Invalid cron expression: {dataset_cron}")
                 except Exception as e:
                     raise ValueError(f"Error checking changes for dataset {dataset}: {str(e)}")
 
@@ -211,6 +243,7 @@ class SnowflakeDag(DAG):
         super().__init__(name, schedule=schedule, warehouse=warehouse, user_task_managed_initial_warehouse_size=user_task_managed_initial_warehouse_size, error_integration=error_integration, comment=comment, task_auto_retry_attempts=task_auto_retry_attempts, allow_overlapping_execution=allow_overlapping_execution, user_task_timeout_ms=user_task_timeout_ms, suspend_task_after_num_failures=suspend_task_after_num_failures, config=config, session_parameters=session_parameters, stage_location=stage_location, imports=imports, packages=packages, use_func_return_value=use_func_return_value)
         self.definition = definition
         self.condition = condition
+        self.changes = changes
 
     def _to_low_level_task(self) -> Task:
         return Task(
@@ -318,6 +351,15 @@ class SnowflakePipeline(AbstractPipeline[SnowflakeDag, DAGTask, List[DAGTask], S
 
         update_group_dependencies(self)
 
+        # tag the queries of each task with the pipeline and the task, the procedures tagging the beginning of their transaction with the schedule window at runtime
+        import json
+        for task in [self.dag] + list(self.dag.tasks):
+            task_name = task.name if task is self.dag else task.full_name
+            session_parameters = dict(task.session_parameters or dict())
+            if 'QUERY_TAG' not in session_parameters:
+                session_parameters.update({'QUERY_TAG': json.dumps({'pipeline': self.pipeline_id, 'task': task_name})})
+            task.session_parameters = session_parameters
+
         return super().__exit__(exc_type, exc_value, traceback)
 
     @property
@@ -344,23 +386,295 @@ class SnowflakePipeline(AbstractPipeline[SnowflakeDag, DAGTask, List[DAGTask], S
 
     def deploy(self, **kwargs) -> None:
         """Deploy the pipeline."""
+        session = self.__class__.session(**kwargs)
+        database, schema = self.__class__.deploy_location(**kwargs)
+        stage_name = f"{database}.{schema}.{self.stage_location}".upper()
+        result = session.sql(f"SHOW STAGES LIKE '{stage_name.split('.')[-1]}'").collect()
+        if not result:
+            session.sql(f"CREATE STAGE {stage_name}").collect()
+        self.deploy_dag(session, database, schema, **kwargs)
+
+    @classmethod
+    def deploy_location(cls, **kwargs) -> tuple:
+        """Returns the database and the schema where the pipelines have to be deployed."""
         import os
         env = os.environ.copy() # Copy the current environment variables
-        session = self.__class__.session(**kwargs)
         database = kwargs.get('SNOWFLAKE_DB', env.get('SNOWFLAKE_DB', None))
         schema = kwargs.get('SNOWFLAKE_SCHEMA', env.get('SNOWFLAKE_SCHEMA', None))
         if database is None or schema is None:
             raise ValueError("Database and schema must be provided to deploy the pipeline")
+        return database, schema
+
+    def deploy_dag(self, session: Session, database: str, schema: str, **kwargs) -> None:
+        """Deploy the tasks of the pipeline, its stage being already created.
+        Args:
+            session (Session): The Snowflake session.
+            database (str): The database.
+            schema (str): The schema.
+        """
         stage_name = f"{database}.{schema}.{self.stage_location}".upper()
-        result = session.sql(f"SHOW STAGES LIKE '{stage_name.split('.')[-1]}'").collect()
-        if not result:
-            session.sql(f"CREATE STAGE {stage_name}").collect()
+        self.upload_context(session, stage_name, kwargs.get('deploy_staging_dir', None))
         session.custom_package_usage_config = {"enabled": True, "force_push": True}
         op = self.get_dag_operation(session, database, schema)
-        # op.delete(pipeline_id)
-        op.deploy(self.dag, mode = CreateMode.or_replace)
+        self.apply_task_warehouses(kwargs.get('task_warehouses', None))
+        fingerprints = self.tag_fingerprints()
+        full_deploy = str(kwargs.get('full_deploy', 'false')).lower() in ['true', '1', 'yes', 'y']
+        if full_deploy or not self.deploy_incrementally(session, op, database, schema, fingerprints):
+            # op.delete(pipeline_id)
+            op.deploy(self.dag, mode = CreateMode.or_replace)
         print(f"Pipeline {self.pipeline_id} deployed")
 
+    @classmethod
+    def deploy_all(cls, pipelines: List[AbstractPipeline], **kwargs) -> None:
+        """Deploy several pipelines concurrently.
+        The stages are created once for all the pipelines, then the pipelines are deployed by a pool of workers, each one with its own session.
+        Args:
+            pipelines (List[AbstractPipeline]): the pipelines to deploy.
+            deploy_concurrency (int): the maximum number of pipelines deployed at the same time. Defaults to 4.
+        """
+        import threading, time
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        pipelines = [pipeline for pipeline in pipelines if isinstance(pipeline, SnowflakePipeline)]
+        if not pipelines:
+            return
+        concurrency = max(1, min(int(kwargs.pop('deploy_concurrency', 4)), pipelines.__len__()))
+        database, schema = cls.deploy_location(**kwargs)
+
+        # create the missing stages once
+        session = cls.session(**kwargs)
+        sessions = [session]
+        existing_stages = set([str(row.as_dict().get('name', '')).upper() for row in session.sql(f"SHOW STAGES IN SCHEMA {database}.{schema}").collect()])
+        for stage in sorted(set([pipeline.stage_location.upper() for pipeline in pipelines])):
+            if stage not in existing_stages:
+                session.sql(f"CREATE STAGE IF NOT EXISTS {database}.{schema}.{stage}").collect()
+
+        # each worker deploys its pipelines with its own session
+        local = threading.local()
+        lock = threading.Lock()
+        def worker_session() -> Session:
+            if not hasattr(local, 'session'):
+                local.session = cls.session(**kwargs)
+                with lock:
+                    sessions.append(local.session)
+            return local.session
+
+        def deploy(pipeline: SnowflakePipeline) -> float:
+            start = time.perf_counter()
+            pipeline.deploy_dag(worker_session(), database, schema, **kwargs)
+            return time.perf_counter() - start
+
+        latencies = dict()
+        failures = dict()
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {executor.submit(deploy, pipeline): pipeline.pipeline_id for pipeline in pipelines}
+                for future in as_completed(futures):
+                    pipeline_id = futures[future]
+                    try:
+                        latencies[pipeline_id] = future.result()
+                    except Exception as e:
+                        failures[pipeline_id] = e
+                        print(f"Pipeline {pipeline_id} failed to deploy: {e}")
+        finally:
+            for s in sessions:
+                try:
+                    s.close()
+                except Exception:
+                    pass
+        elapsed = time.perf_counter() - start
+
+        print(f"Deployed {latencies.__len__()}/{pipelines.__len__()} pipelines in {elapsed:.1f}s with {concurrency} workers")
+        for pipeline_id, latency in sorted(latencies.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {pipeline_id}: {latency:.1f}s")
+        if latencies:
+            durations = sorted(latencies.values())
+            print(f"  min {durations[0]:.1f}s, median {durations[durations.__len__() // 2]:.1f}s, max {durations[-1]:.1f}s")
+        if failures:
+            raise RuntimeError(f"Failed to deploy the pipelines {', '.join(sorted(failures.keys()))}")
+
+    def upload_context(self, session: Session, stage_name: str, staging_dir: Optional[str] = None) -> None:
+        """Upload the externalized context shared by the tasks of the pipeline to the stage, if it does not exist yet.
+        The context is first written under the staging directory of the deployment.
+        Args:
+            session (Session): The Snowflake session.
+            stage_name (str): The fully qualified name of the stage.
+            staging_dir (Optional[str]): The staging directory of the deployment. Defaults to a temporary directory removed once the context has been uploaded.
+        """
+        job = self.job
+        if isinstance(job, StarlakeSnowflakeJob):
+            artifact = job.context_artifact()
+            if artifact:
+                path, data = artifact
+                if session.sql(f"LIST @{stage_name}/{path}").collect():
+                    print(f"Context {path} already uploaded")
+                else:
+                    import os, tempfile
+                    with tempfile.TemporaryDirectory(prefix='sl_deploy_') as temp_dir:
+                        staged_file = os.path.join(staging_dir or temp_dir, path)
+                        os.makedirs(os.path.dirname(staged_file), exist_ok=True)
+                        with open(staged_file, 'wb') as f:
+                            f.write(data)
+                        with open(staged_file, 'rb') as f:
+                            session.file.put_stream(f, f"@{stage_name}/{path}", auto_compress=False, overwrite=True)
+                    print(f"Context {path} uploaded ({len(data)} bytes)")
+
+    def apply_task_warehouses(self, task_warehouses: Optional[Union[str, dict]] = None) -> None:
+        """Override the warehouse of the tasks of the pipeline, i.e as recommended by the SnowflakeWarehouseSizingAdvisor.
+        Each task, identified by its name or its full name, is mapped either to a warehouse or to serverless[:<initial warehouse size>].
+        Args:
+            task_warehouses (Optional[Union[str, dict]]): the warehouse by task, in json format. Defaults to the task_warehouses option of the job.
+        """
+        if task_warehouses is None:
+            job = self.job
+            task_warehouses = job.task_warehouses if isinstance(job, StarlakeSnowflakeJob) else dict()
+        elif isinstance(task_warehouses, str):
+            import json
+            task_warehouses = json.loads(task_warehouses or '{}')
+        task_warehouses = {str(task).lower(): str(warehouse) for task, warehouse in task_warehouses.items()}
+        if not task_warehouses:
+            return
+        for task in self.dag.tasks:
+            warehouse = task_warehouses.get(task.full_name.lower(), task_warehouses.get(task.name.lower(), None))
+            if not warehouse:
+                continue
+            if warehouse.lower().startswith('serverless'):
+                size = warehouse.split(':', 1)[1].strip().upper() if ':' in warehouse else None
+                task.warehouse = None
+                task.user_task_managed_initial_warehouse_size = size
+                print(f"Task {task.full_name} will be run serverless{f' ({size})' if size else ''}")
+            else:
+                task.warehouse = warehouse
+                task.user_task_managed_initial_warehouse_size = None
+                print(f"Task {task.full_name} will be run on warehouse {warehouse}")
+
+    FINGERPRINT_PATTERN = r"\s*\[sl_fingerprint=([0-9a-f]+)\]$"
+
+    def tag_fingerprints(self) -> dict:
+        """Compute the fingerprint of the root and of each task of the pipeline and tag their comment with it.
+        The fingerprint of a task only depends on the explicit fields of its definition: the definition generated by the job (i.e its command, its SQL and its options),
+        the stored procedure arguments, packages and stage, its warehouse, its schedule or condition, its predecessors and its configuration.
+        The code of the stored procedures is identified by its name and by the version of the library, so that it does not depend on the process that generates the pipeline.
+        Returns:
+            dict: the fingerprints by task name.
+        """
+        import re
+        job = self.job
+        try:
+            from importlib.metadata import version
+            library_version = version('starlake-snowflake')
+        except Exception:
+            library_version = None
+        def definition_parts(definition, task_id: Optional[str] = None) -> list:
+            if isinstance(definition, StoredProcedureCall):
+                task_definition = job.task_definition(task_id) if task_id and isinstance(job, StarlakeSnowflakeJob) else None
+                func = definition.func
+                name = f"{func.__module__}.{func.__qualname__}" if callable(func) else str(func)
+                return [name, library_version, definition._args, sorted(definition._packages or []), definition._stage_location, task_definition]
+            return [definition]
+        def tag(task: Union[SnowflakeDag, DAGTask], fingerprint: str) -> None:
+            comment = re.sub(self.FINGERPRINT_PATTERN, '', task.comment or '')
+            task.comment = f"{comment} [sl_fingerprint={fingerprint}]".strip()
+        fingerprints = dict()
+        dag = self.dag
+        fingerprint = _fingerprint(definition_parts(dag.definition), dag.changes, sorted(dag.packages or []), str(dag.schedule), dag.warehouse, dag.condition, dag.config, dag.session_parameters, dag.user_task_timeout_ms, dag.task_auto_retry_attempts, re.sub(self.FINGERPRINT_PATTERN, '', dag.comment or ''))
+        tag(dag, fingerprint)
+        fingerprints.update({dag.name.lower(): fingerprint})
+        for task in dag.tasks:
+            fingerprint = _fingerprint(definition_parts(task.definition, task.name), sorted(dag.packages or []), task.warehouse, task.user_task_managed_initial_warehouse_size, task.condition, task.session_parameters, task.user_task_timeout_ms, sorted([predecessor.full_name for predecessor in task.predecessors]), re.sub(self.FINGERPRINT_PATTERN, '', task.comment or ''))
+            tag(task, fingerprint)
+            fingerprints.update({task.full_name.lower(): fingerprint})
+        return fingerprints
+
+    def to_task(self, task: DAGTask) -> Task:
+        """Returns the task to create or alter, built from the public attributes of the DAG task.
+        Args:
+            task (DAGTask): the DAG task.
+        Returns:
+            Task: the task.
+        """
+        finalizer = self.dag.get_finalizer_task()
+        is_finalizer = finalizer is not None and finalizer.full_name == task.full_name
+        predecessors = [predecessor.full_name for predecessor in task.predecessors]
+        if not predecessors and not is_finalizer:
+            predecessors = [self.dag.name]
+        return Task(
+            name=task.full_name,
+            definition=task.definition,
+            condition=task.condition,
+            warehouse=task.warehouse,
+            user_task_managed_initial_warehouse_size=task.user_task_managed_initial_warehouse_size,
+            comment=task.comment,
+            user_task_timeout_ms=task.user_task_timeout_ms,
+            session_parameters=task.session_parameters,
+            predecessors=predecessors or None,
+            finalize=self.dag.name if is_finalizer else None,
+        )
+
+    def deploy_incrementally(self, session: Session, op: DAGOperation, database: str, schema: str, fingerprints: dict) -> bool:
+        """Deploy only the tasks whose fingerprint has changed since the last deployment.
+        The changed tasks are created or altered in place, so that the links of their successors are preserved.
+        Args:
+            session (Session): The Snowflake session.
+            op (DAGOperation): The DAG operation.
+            database (str): The database.
+            schema (str): The schema.
+            fingerprints (dict): the fingerprints of the tasks by task name.
+        Returns:
+            bool: True if the pipeline has been deployed incrementally, False if it has to be fully deployed.
+        """
+        import re
+        if self.dag.use_func_return_value or not all([isinstance(task.definition, (str, StoredProcedureCall)) for task in self.dag.tasks]):
+            # the definitions of the tasks have to be wrapped by the DAG operation
+            return False
+        pipeline_id = self.pipeline_id.lower()
+        deployed = dict() # task name -> (fingerprint, state)
+        for row in session.sql(f"SHOW TASKS LIKE '{self.pipeline_id}%' IN SCHEMA {database}.{schema}").collect():
+            d = row.as_dict()
+            name = str(d.get('name', '')).lower()
+            if name == pipeline_id or name.startswith(f"{pipeline_id}$"):
+                match = re.search(self.FINGERPRINT_PATTERN, d.get('comment', None) or '')
+                deployed.update({name: (match.group(1) if match else None, str(d.get('state', '')).lower())})
+        root = deployed.get(pipeline_id, None)
+        if not root or root[0] != fingerprints.get(pipeline_id, None):
+            # the root task is missing or has changed
+            return False
+
+        # tasks whose fingerprint has changed have to be created or altered
+        changed = set([name for name, fingerprint in fingerprints.items() if name != pipeline_id and deployed.get(name, (None, None))[0] != fingerprint])
+        tasks = list(self.dag.tasks)
+        removed = set(deployed.keys()) - set(fingerprints.keys())
+        if not changed and not removed:
+            print(f"Pipeline {self.pipeline_id} is up to date")
+            return True
+
+        from contextlib import suppress
+        from snowflake.core.exceptions import NotFoundError
+        root_task = op.schema.tasks[self.dag.name]
+        root_task.suspend()
+        for name in removed:
+            print(f"Dropping task {name}")
+            with suppress(NotFoundError):
+                op.schema.tasks[name].suspend()
+                op.schema.tasks[name].drop()
+        # create or alter the changed tasks, predecessors first
+        remaining = [task for task in tasks if task.full_name.lower() in changed]
+        deployed_tasks = set()
+        while remaining:
+            ready = [task for task in remaining if all([predecessor.full_name.lower() not in changed or predecessor.full_name.lower() in deployed_tasks for predecessor in task.predecessors])]
+            if not ready:
+                raise ValueError("There is a cycle in the task graph.")
+            for task in ready:
+                print(f"Deploying task {task.full_name}")
+                op.schema.tasks[task.full_name].create_or_alter(self.to_task(task))
+                op.schema.tasks[task.full_name].resume()
+                deployed_tasks.add(task.full_name.lower())
+            remaining = [task for task in remaining if task.full_name.lower() not in deployed_tasks]
+        if root[1] == 'started':
+            root_task.resume()
+        print(f"Pipeline {self.pipeline_id} deployed incrementally: {len(deployed_tasks)} task(s) created or altered, {len(removed)} task(s) dropped")
+        return True
+
     def delete(self, **kwargs) -> None:
         import os
         env = os.environ.copy() # Copy the current environment variables
@@ -379,9 +693,16 @@ class SnowflakePipeline(AbstractPipeline[SnowflakeDag, DAGTask, List[DAGTask], S
             logical_date (Optional[str]): the logical date.
             timeout (str): the timeout in seconds.
             mode (StarlakeExecutionMode): the execution mode.
+            session (Optional[Session]): the optional session to use, such as a local session. Defaults to a new Snowflake session.
         """
-        session = self.__class__.session(**kwargs)
+        session = kwargs.pop('session', None) or self.__class__.session(**kwargs)
         if mode == StarlakeExecutionMode.DRY_RUN:
+            job = self.job
+            artifact = job.context_artifact() if isinstance(job, StarlakeSnowflakeJob) else None
+            if artifact:
+                # the externalized context is provided in-process since it may not have been uploaded yet
+                path, data = artifact
+                session.sl_local_contexts = {f"@{job.stage_location}/{path}": data}
             def dry_run(definition) -> None:
                 if isinstance(definition, StoredProcedureCall):
                     func = definition.func
@@ -408,68 +729,11 @@ class SnowflakePipeline(AbstractPipeline[SnowflakeDag, DAGTask, List[DAGTask], S
                 task.suspend()
                 session.sql(f"ALTER TASK IF EXISTS {self.pipeline_id} SET CONFIG = '{json.dumps(config)}'").collect()
                 task.resume()
+            monitor = SnowflakeRunMonitor(session, timeout=int(timeout))
+            since = monitor.current_epoch()
             task.execute()
-            from datetime import datetime
-            dag_runs = op.get_current_dag_runs(self.dag)
-            start = datetime.now()
-            def check_started(dag_runs: List[DAGRun]) -> bool:
-                import time
-                if not dag_runs:
-                    raise ValueError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} failed to run")
-                else:
-                    while True:
-                        dag_runs_sorted: List[DAGRun] = sorted(dag_runs, key=lambda run: run.scheduled_time, reverse=True)
-                        last_run: DAGRun = dag_runs_sorted[0]
-                        state = last_run.state
-                        print(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} is {state.lower()}")
-                        if state.upper() == 'EXECUTING':
-                            return True
-                        else:
-                            if datetime.now() - start > timedelta(seconds=int(timeout)):
-                                raise TimeoutError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} timed out")
-                            time.sleep(5)
-                            return check_started(op.get_current_dag_runs(self.dag))
-            check_started(dag_runs)
-            def check_status(result: SnowflakeDagResult) -> SnowflakeDagResult:
-                import time
-                while True:
-                    rows: List[Row] = session.sql(
-                        f"""SELECT NAME, STATE, GRAPH_RUN_GROUP_ID 
-                            FROM TABLE(INFORMATION_SCHEMA.TASK_HISTORY())
-                            WHERE GRAPH_RUN_GROUP_ID IN (
-                                SELECT GRAPH_RUN_GROUP_ID FROM TABLE(INFORMATION_SCHEMA.TASK_HISTORY())
-                            WHERE NAME ilike '{self.pipeline_id}%' AND COMPLETED_TIME is not null
-                                ORDER BY COMPLETED_TIME DESC
-                                LIMIT 1
-                            )""").collect()
-                    if rows:
-                        for row in rows:
-                            d = row.as_dict()
-                            name = d.get('NAME', None)
-                            state = d.get('STATE', None)
-                            graph_run_group_id = d.get('GRAPH_RUN_GROUP_ID', None)
-                            if name and state and graph_run_group_id:
-                                result.update_task_result(name, state, graph_run_group_id)
-                        if result.has_failed:
-                            return result
-                        elif result.is_succeeded:
-                            return result
-                        elif datetime.now() - start > timedelta(seconds=int(timeout)):
-                            raise TimeoutError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} timed out")
-                        elif result.is_executing:
-                            print(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} is still executing")
-                            time.sleep(5)
-                            return check_status(result)
-                        else:
-                            # if the pipeline is not executing and has not failed, we consider it as failed
-                            raise ValueError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} failed")
-                    elif datetime.now() - start > timedelta(seconds=int(timeout)):
-                        raise TimeoutError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} timed out")
-                    else:
-                        print(f"No task history found for {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} yet")
-                        time.sleep(5)
-                        return check_status(result)
-            status = check_status(SnowflakeDagResult(tasks = list(map(lambda task: SnowflakeTaskResult(name = task.full_name), self.dag.tasks))))
+            monitor.watch(self.pipeline_id, SnowflakeDagResult(tasks = list(map(lambda task: SnowflakeTaskResult(name = task.full_name), self.dag.tasks))), since=since, logical_date=logical_date)
+            status = monitor.wait()[self.pipeline_id]
             if status.has_failed:
                 raise ValueError(f"Pipeline {self.pipeline_id} {f'with logical date {logical_date}' if logical_date else ''} failed -> {status}")
             elif status.is_succeeded:
@@ -480,7 +744,7 @@ class SnowflakePipeline(AbstractPipeline[SnowflakeDag, DAGTask, List[DAGTask], S
         elif mode == StarlakeExecutionMode.BACKFILL:
             if not logical_date:
                 raise ValueError("Logical date must be provided to backfill the pipeline")
-            self.run(logical_date=logical_date, timeout=timeout, mode=StarlakeExecutionMode.RUN, **kwargs)
+            self.run(logical_date=logical_date, timeout=timeout, mode=StarlakeExecutionMode.RUN, session=session, **kwargs)
 
         else:
             raise ValueError(f"Execution mode {mode} is not supported")
@@ -559,6 +823,115 @@ class SnowflakeDagResult:
     def __str__(self) -> str:
         return self.__repr__()
 
+class SnowflakeRunMonitor:
+    """Monitor the graph runs of one or more pipelines.
+    The task history is polled with a single query per poll for all the watched pipelines,
+    bounded by the earliest scheduled time to watch, using an exponential backoff with jitter between polls.
+    """
+    def __init__(self, session: Session, timeout: int = 120, initial_delay: float = 1.0, max_delay: float = 30.0, backoff: float = 2.0, jitter: float = 0.2, result_limit: int = 10000) -> None:
+        """Initialize the monitor.
+        Args:
+            session (Session): The Snowflake session.
+            timeout (int): the global timeout in seconds for all the watched pipelines. Defaults to 120.
+            initial_delay (float): the initial delay in seconds between two polls. Defaults to 1.0.
+            max_delay (float): the maximum delay in seconds between two polls. Defaults to 30.0.
+            backoff (float): the multiplier applied to the delay after each poll. Defaults to 2.0.
+            jitter (float): the relative jitter applied to each delay. Defaults to 0.2.
+            result_limit (int): the maximum number of rows returned by the task history. Defaults to 10000.
+        """
+        self.session = session
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.result_limit = result_limit
+        self._watched: dict = dict() # pipeline id -> (result, since, logical date)
+
+    def current_epoch(self) -> int:
+        """Returns the current timestamp of the Snowflake account in seconds since epoch, in order to avoid any clock skew."""
+        rows = self.session.sql("SELECT DATE_PART(EPOCH_SECOND, CURRENT_TIMESTAMP())").collect()
+        if rows:
+            return int(rows[0][0])
+        import time
+        return int(time.time())
+
+    def watch(self, pipeline_id: str, result: SnowflakeDagResult, since: int, logical_date: Optional[str] = None) -> None:
+        """Watch the graph run of a pipeline.
+        Args:
+            pipeline_id (str): the pipeline id.
+            result (SnowflakeDagResult): the result to update with the state of the tasks.
+            since (int): the timestamp in seconds since epoch from which the graph run has been scheduled.
+            logical_date (Optional[str]): the optional logical date of the run.
+        """
+        self._watched.update({pipeline_id: (result, since, logical_date)})
+
+    def _history(self, pipeline_ids: List[str]) -> List[Row]:
+        since = min([self._watched[pipeline_id][1] for pipeline_id in pipeline_ids])
+        patterns = ', '.join([f"'{pipeline_id}%'" for pipeline_id in pipeline_ids])
+        return self.session.sql(
+            f"""SELECT NAME, STATE, GRAPH_RUN_GROUP_ID, SCHEDULED_TIME
+                FROM TABLE(INFORMATION_SCHEMA.TASK_HISTORY(
+                    SCHEDULED_TIME_RANGE_START => TO_TIMESTAMP_LTZ({since}),
+                    RESULT_LIMIT => {self.result_limit}
+                ))
+                WHERE NAME ILIKE ANY ({patterns})
+                ORDER BY SCHEDULED_TIME DESC""").collect()
+
+    def _update(self, pipeline_id: str, rows: List[Row]) -> bool:
+        """Update the result of the pipeline with the rows of its most recent started graph run.
+        Returns:
+            bool: True if the graph run of the pipeline is done, False otherwise.
+        """
+        result, _, logical_date = self._watched[pipeline_id]
+        label = f"Pipeline {pipeline_id} {f'with logical date {logical_date}' if logical_date else ''}"
+        pipeline_rows = []
+        for row in rows:
+            d = row.as_dict()
+            name = str(d.get('NAME', None) or '').lower()
+            if name == pipeline_id.lower() or name.startswith(f"{pipeline_id.lower()}$"):
+                pipeline_rows.append(d)
+        # the rows are sorted by scheduled time in descending order, the next scheduled run being ignored
+        graph_run_group_id = next((d.get('GRAPH_RUN_GROUP_ID', None) for d in pipeline_rows if d.get('STATE', None) != 'SCHEDULED'), None)
+        if not graph_run_group_id:
+            print(f"No task history found for {label} yet")
+            return False
+        for d in pipeline_rows:
+            name = d.get('NAME', None)
+            state = d.get('STATE', None)
+            if d.get('GRAPH_RUN_GROUP_ID', None) == graph_run_group_id and name and state:
+                result.update_task_result(name, 'EXECUTING' if state == 'SCHEDULED' else state, graph_run_group_id)
+        if result.has_failed or result.is_succeeded:
+            return True
+        elif result.is_executing:
+            print(f"{label} is still executing")
+            return False
+        else:
+            # if the pipeline is not executing and has not failed, we consider it as failed
+            raise ValueError(f"{label} failed -> {result}")
+
+    def wait(self) -> dict:
+        """Wait for the graph runs of all the watched pipelines to complete.
+        Returns:
+            dict: the results of the watched pipelines by pipeline id.
+        """
+        import random
+        import time
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_delay
+        pending = list(self._watched.keys())
+        while pending:
+            rows = self._history(pending)
+            pending = [pipeline_id for pipeline_id in pending if not self._update(pipeline_id, rows)]
+            if not pending:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Pipeline(s) {', '.join(pending)} timed out")
+            time.sleep(min(remaining, delay * (1 + random.uniform(-self.jitter, self.jitter))))
+            delay = min(self.max_delay, delay * self.backoff)
+        return {pipeline_id: watched[0] for pipeline_id, watched in self._watched.items()}
+
 class SnowflakeTaskGroup(AbstractTaskGroup[List[DAGTask]]):
     def __init__(self, group_id: str, group: List[DAGTask], dag: Optional[SnowflakeDag] = None, **kwargs) -> None:
         super().__init__(group_id=group_id, orchestration_cls=SnowflakeOrchestration, group=group, **kwargs)
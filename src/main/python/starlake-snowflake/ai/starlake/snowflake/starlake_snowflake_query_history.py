@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import sqlite3
+
+from contextlib import closing
+from typing import List, Optional
+
+from snowflake.snowpark import Session
+
+class SnowflakeQueryHistoryCollector:
+    """Collect the history of the queries tagged by the Starlake pipelines into a local SQLite store
+    and report their compilation time, execution time, bytes scanned and credits per task and schedule window.
+    The pipeline and the task of a query are given by its QUERY_TAG, set by the session parameters of the task,
+    while its schedule window is given by the sl_query_tag comment of the statement beginning the transaction within the same session.
+    """
+    def __init__(self, store: str = 'sl_query_history.db') -> None:
+        """Initialize the collector.
+        Args:
+            store (str): the path of the local SQLite store. Defaults to sl_query_history.db.
+        """
+        self.store = store
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS query_history (
+                    query_id TEXT PRIMARY KEY,
+                    pipeline TEXT,
+                    task TEXT,
+                    sl_start_date TEXT,
+                    sl_end_date TEXT,
+                    start_time TEXT,
+                    query_type TEXT,
+                    compilation_time INTEGER,
+                    execution_time INTEGER,
+                    bytes_scanned INTEGER,
+                    credits REAL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.store)
+
+    def collect(self, session: Session, pipeline_id: Optional[str] = None, hours: int = 24, account_usage: bool = False, result_limit: int = 10000) -> int:
+        """Pull the history of the tagged queries into the local store.
+        Args:
+            session (Session): The Snowflake session.
+            pipeline_id (Optional[str]): the optional pipeline whose queries have to be collected. Defaults to all the pipelines.
+            hours (int): the number of hours of history to collect. Defaults to 24.
+            account_usage (bool): whether to use the ACCOUNT_USAGE views, which include the compute credits attributed to each query but with a latency of a few hours,
+                instead of the INFORMATION_SCHEMA.QUERY_HISTORY table function, which only reports the cloud services credits. Defaults to False.
+            result_limit (int): the maximum number of queries returned by the INFORMATION_SCHEMA.QUERY_HISTORY table function. Defaults to 10000.
+        Returns:
+            int: the number of queries collected.
+        """
+        pipeline_filter = f"AND TRY_PARSE_JSON(q.QUERY_TAG):pipeline::string ILIKE '{pipeline_id}'" if pipeline_id else ""
+        # the schedule window tagging one statement of the session of the task
+        window = "TRY_PARSE_JSON(MAX(REGEXP_SUBSTR(q.QUERY_TEXT, 'sl_query_tag=([{][^*]*[}])', 1, 1, 'e', 1)) OVER (PARTITION BY q.SESSION_ID))"
+        columns = f"""q.QUERY_ID,
+                TRY_PARSE_JSON(q.QUERY_TAG):pipeline::string AS PIPELINE,
+                TRY_PARSE_JSON(q.QUERY_TAG):task::string AS TASK,
+                {window}:sl_start_date::string AS SL_START_DATE,
+                {window}:sl_end_date::string AS SL_END_DATE,
+                TO_VARCHAR(q.START_TIME) AS START_TIME,
+                q.QUERY_TYPE,
+                q.COMPILATION_TIME,
+                q.EXECUTION_TIME,
+                q.BYTES_SCANNED"""
+        # the credits are cast to float since SQLite does not support decimals
+        if account_usage:
+            query = f"""SELECT {columns},
+                (COALESCE(q.CREDITS_USED_CLOUD_SERVICES, 0) + COALESCE(a.CREDITS_ATTRIBUTED_COMPUTE, 0))::FLOAT AS CREDITS
+                FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY q
+                LEFT JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY a ON a.QUERY_ID = q.QUERY_ID
+                WHERE q.START_TIME >= DATEADD('hour', -{hours}, CURRENT_TIMESTAMP())
+                AND TRY_PARSE_JSON(q.QUERY_TAG):pipeline IS NOT NULL {pipeline_filter}"""
+        else:
+            query = f"""SELECT {columns},
+                q.CREDITS_USED_CLOUD_SERVICES::FLOAT AS CREDITS
+                FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY(
+                    END_TIME_RANGE_START => DATEADD('hour', -{hours}, CURRENT_TIMESTAMP()),
+                    RESULT_LIMIT => {result_limit}
+                )) q
+                WHERE TRY_PARSE_JSON(q.QUERY_TAG):pipeline IS NOT NULL {pipeline_filter}"""
+        count = 0
+        with closing(self._connect()) as connection, connection:
+            batch = []
+            for row in session.sql(query).to_local_iterator():
+                batch.append(tuple(row))
+                if batch.__len__() >= 1000:
+                    count += self._store(connection, batch)
+                    batch = []
+            count += self._store(connection, batch)
+        return count
+
+    def _store(self, connection: sqlite3.Connection, rows: List[tuple]) -> int:
+        if rows:
+            connection.executemany("INSERT OR REPLACE INTO query_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return rows.__len__()
+
+    def report(self, pipeline_id: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Report the cost and latency of the collected queries per task and schedule window, the slowest first.
+        Args:
+            pipeline_id (Optional[str]): the optional pipeline to report. Defaults to all the pipelines.
+            limit (Optional[int]): the optional maximum number of lines to report.
+        Returns:
+            List[dict]: the number of queries, compilation time and execution time in milliseconds, bytes scanned and credits per task and window.
+        """
+        query = """SELECT pipeline, task, sl_start_date, sl_end_date,
+                COUNT(*) AS queries,
+                SUM(compilation_time) AS compilation_time,
+                SUM(execution_time) AS execution_time,
+                SUM(bytes_scanned) AS bytes_scanned,
+                SUM(credits) AS credits
+            FROM query_history
+            WHERE (? IS NULL OR LOWER(pipeline) = LOWER(?))
+            GROUP BY pipeline, task, sl_start_date, sl_end_date
+            ORDER BY execution_time DESC"""
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(query, [pipeline_id, pipeline_id])
+            fields = [description[0] for description in cursor.description]
+            return [dict(zip(fields, values)) for values in cursor.fetchall()]
+
+    def print_report(self, pipeline_id: Optional[str] = None, limit: Optional[int] = None) -> None:
+        """Print the report of the collected queries per task and schedule window."""
+        for line in self.report(pipeline_id, limit):
+            window = f"[{line['sl_start_date']} - {line['sl_end_date']}]" if line['sl_start_date'] else ""
+            print(f"{line['task']} {window}: {line['queries']} queries, compilation {line['compilation_time']} ms, execution {line['execution_time']} ms, {line['bytes_scanned']} bytes scanned, {line['credits'] or 0:.6f} credits")
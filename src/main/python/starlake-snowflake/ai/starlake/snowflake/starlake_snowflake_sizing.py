@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+
+from typing import Dict, List, Optional
+
+from snowflake.snowpark import Session
+
+# the warehouse sizes with the credits they consume per hour
+WAREHOUSE_SIZES: Dict[str, int] = {
+    'XSMALL': 1,
+    'SMALL': 2,
+    'MEDIUM': 4,
+    'LARGE': 8,
+    'XLARGE': 16,
+    'XXLARGE': 32,
+    'XXXLARGE': 64,
+    'X4LARGE': 128,
+}
+
+SERVERLESS = 'SERVERLESS'
+
+def normalize_warehouse_size(size: str) -> str:
+    """Normalize a warehouse size as returned by SHOW WAREHOUSES (i.e X-Small, 2X-Large) to the names of WAREHOUSE_SIZES."""
+    size = size.upper().replace('-', '').replace('_', '').replace(' ', '')
+    return {'2XLARGE': 'XXLARGE', '3XLARGE': 'XXXLARGE', '4XLARGE': 'X4LARGE'}.get(size, size)
+
+class SnowflakeTaskRuntime:
+    """The historical runtime of a task, as recorded in the audit table."""
+    def __init__(self, task: str, runs: int, duration: float, count: float) -> None:
+        self.task = task
+        self.runs = runs
+        self.duration = duration # the 90th percentile of the duration in seconds
+        self.count = count # the average number of rows
+
+    def __repr__(self) -> str:
+        return f"Task {self.task}: {self.runs} runs, {self.duration:.1f}s, {self.count:.0f} rows"
+
+class SnowflakeWarehouseSizingAdvisor:
+    """Advise a warehouse size or the serverless compute for each task of a pipeline from the durations and the row counts of its previous runs.
+    The duration of a task on another warehouse size is estimated assuming that it scales with the credits of the warehouse raised to the power of the efficiency,
+    a task billed at least one minute per run on a warehouse and per second when serverless.
+    """
+    def __init__(self, budget: Optional[float] = None, target_duration: Optional[float] = None, efficiency: float = 0.8, serverless_threshold: float = 60.0, serverless_multiplier: float = 1.2, min_runs: int = 3, history_days: int = 30) -> None:
+        """Initialize the advisor.
+        Args:
+            budget (Optional[float]): the optional maximum number of credits for a run of all the tasks.
+            target_duration (Optional[float]): the optional duration in seconds that each task should not exceed, the cheapest size being chosen otherwise.
+            efficiency (float): how much the duration of a task decreases when the warehouse size doubles, 1 meaning that the duration is halved. Defaults to 0.8.
+            serverless_threshold (float): the estimated duration in seconds on the smallest warehouse under which a task is run serverless. Defaults to 60.
+            serverless_multiplier (float): the cost of the serverless compute relative to the same warehouse size. Defaults to 1.2.
+            min_runs (int): the minimum number of successful runs required to advise a task. Defaults to 3.
+            history_days (int): the number of days of audit history to consider. Defaults to 30.
+        """
+        self.budget = budget
+        self.target_duration = target_duration
+        self.efficiency = efficiency
+        self.serverless_threshold = serverless_threshold
+        self.serverless_multiplier = serverless_multiplier
+        self.min_runs = min_runs
+        self.history_days = history_days
+
+    def fetch_history(self, session: Session, pipeline_id: str, audit_domain: str = 'audit') -> List[SnowflakeTaskRuntime]:
+        """Retrieve the runtime of the tasks of the pipeline from the audit table.
+        Args:
+            session (Session): The Snowflake session.
+            pipeline_id (str): the pipeline id.
+            audit_domain (str): the domain of the audit table. Defaults to audit.
+        Returns:
+            List[SnowflakeTaskRuntime]: the runtime of the tasks which have enough successful runs.
+        """
+        rows = session.sql(
+            f"""SELECT JOBID, COUNT(*) AS RUNS, APPROX_PERCENTILE(DURATION, 0.9) AS DURATION, AVG(GREATEST(COUNT, 0)) AS ROWS_COUNT
+                FROM {audit_domain}.audit
+                WHERE SUCCESS AND STARTSWITH(LOWER(JOBID), LOWER('{pipeline_id}$'))
+                AND TIMESTAMP >= DATEADD('day', -{self.history_days}, CURRENT_TIMESTAMP())
+                GROUP BY JOBID
+                HAVING COUNT(*) >= {self.min_runs}""").collect()
+        return [SnowflakeTaskRuntime(str(row[0]), int(row[1]), float(row[2] or 0), float(row[3] or 0)) for row in rows]
+
+    def current_size(self, session: Session, warehouse: str) -> str:
+        """Retrieve the size of the warehouse.
+        Args:
+            session (Session): The Snowflake session.
+            warehouse (str): the warehouse name.
+        Returns:
+            str: the size of the warehouse.
+        """
+        rows = session.sql(f"SHOW WAREHOUSES LIKE '{warehouse}'").collect()
+        if not rows:
+            raise ValueError(f"Warehouse {warehouse} not found")
+        return normalize_warehouse_size(str(rows[0].as_dict().get('size', 'XSMALL')))
+
+    def estimated_duration(self, runtime: SnowflakeTaskRuntime, current_size: str, size: str) -> float:
+        return runtime.duration * (WAREHOUSE_SIZES[current_size] / WAREHOUSE_SIZES[size]) ** self.efficiency
+
+    def estimated_cost(self, runtime: SnowflakeTaskRuntime, current_size: str, size: str) -> float:
+        return WAREHOUSE_SIZES[size] * max(self.estimated_duration(runtime, current_size, size), 60.0) / 3600
+
+    def _choices(self, runtime: SnowflakeTaskRuntime, current_size: str) -> List[tuple]:
+        """Returns the possible choices of a task as (size, cost, duration), sorted by increasing cost."""
+        smallest = list(WAREHOUSE_SIZES.keys())[0]
+        if self.estimated_duration(runtime, current_size, smallest) < self.serverless_threshold:
+            duration = self.estimated_duration(runtime, current_size, smallest)
+            return [(f"{SERVERLESS}:{smallest}", WAREHOUSE_SIZES[smallest] * duration * self.serverless_multiplier / 3600, duration)]
+        choices = [(size, self.estimated_cost(runtime, current_size, size), self.estimated_duration(runtime, current_size, size)) for size in WAREHOUSE_SIZES.keys()]
+        return sorted(choices, key=lambda choice: (choice[1], choice[2]))
+
+    def advise(self, runtimes: List[SnowflakeTaskRuntime], current_size: str) -> Dict[str, str]:
+        """Advise a warehouse size, or SERVERLESS:<initial size>, for each task.
+        Each task gets the cheapest size meeting the target duration, or the fastest one if none does,
+        then the tasks are downsized, the largest savings first, until the budget is met.
+        Args:
+            runtimes (List[SnowflakeTaskRuntime]): the runtime of the tasks.
+            current_size (str): the size of the warehouse the tasks have been run on.
+        Returns:
+            Dict[str, str]: the advised size by task.
+        """
+        current_size = normalize_warehouse_size(current_size)
+        choices = {runtime.task: self._choices(runtime, current_size) for runtime in runtimes}
+        advice = dict()
+        for task, task_choices in choices.items():
+            meeting_target = [choice for choice in task_choices if self.target_duration is None or choice[2] <= self.target_duration]
+            if meeting_target:
+                advice[task] = meeting_target[0]
+            else:
+                advice[task] = min(task_choices, key=lambda choice: (choice[2], choice[1]))
+        if self.budget is not None:
+            while sum([choice[1] for choice in advice.values()]) > self.budget:
+                # downsize the task whose downsizing saves the most credits
+                savings = []
+                for task, choice in advice.items():
+                    cheaper = [other for other in choices[task] if other[1] < choice[1]]
+                    if cheaper:
+                        cheapest = max(cheaper, key=lambda other: (-other[2], other[1])) # the fastest among the cheaper choices
+                        savings.append((choice[1] - cheapest[1], task, cheapest))
+                if not savings:
+                    print(f"The budget of {self.budget} credits can not be met")
+                    break
+                _, task, cheapest = max(savings, key=lambda saving: saving[0])
+                advice[task] = cheapest
+        for task, choice in advice.items():
+            print(f"Task {task}: {choice[0]} (estimated {choice[2]:.1f}s, {choice[1]:.4f} credits)")
+        return {task: choice[0] for task, choice in advice.items()}
+
+    def recommend(self, session: Session, pipeline, warehouses: Dict[str, str], audit_domain: str = 'audit') -> str:
+        """Recommend the warehouse of each task of a pipeline, as the value of the task_warehouses option applied at deploy time.
+        Args:
+            session (Session): The Snowflake session.
+            pipeline (SnowflakePipeline): the pipeline.
+            warehouses (Dict[str, str]): the warehouse to use for each size.
+            audit_domain (str): the domain of the audit table. Defaults to audit.
+        Returns:
+            str: the warehouse or the serverless size by task, in json format.
+        """
+        runtimes = self.fetch_history(session, pipeline.pipeline_id, audit_domain)
+        advice = self.advise(runtimes, self.current_size(session, pipeline.warehouse))
+        warehouses = {normalize_warehouse_size(size): warehouse for size, warehouse in warehouses.items()}
+        overrides = dict()
+        for task, size in advice.items():
+            if size.startswith(SERVERLESS):
+                overrides[task] = size.lower()
+            elif size in warehouses:
+                overrides[task] = warehouses[size]
+            else:
+                # fallback to the closest larger size which has a warehouse
+                larger = [other for other in WAREHOUSE_SIZES.keys() if WAREHOUSE_SIZES[other] >= WAREHOUSE_SIZES[size] and other in warehouses]
+                if larger:
+                    overrides[task] = warehouses[larger[0]]
+        return json.dumps(overrides)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the ai.starlake namespace is shared with starlake-orchestration, both distributions being run in place
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in [os.path.join(os.path.dirname(_root), 'starlake-orchestration'), _root]:
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
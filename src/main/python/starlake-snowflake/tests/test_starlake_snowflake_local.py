@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("snowflake.core")
+pytest.importorskip("snowflake.snowpark")
+pytest.importorskip("croniter")
+
+from datetime import datetime
+
+from ai.starlake.orchestration import StarlakeDependencies, StarlakeDomain, StarlakeSchedule, StarlakeTable
+from ai.starlake.snowflake import StarlakeSnowflakeJob, SnowflakeOrchestration
+from ai.starlake.snowflake.starlake_snowflake_local import LocalSession, run_pipeline_locally
+
+# the module variables read by the job, as defined by the generated dags
+
+options = {
+    'stage_location': 'starlake_stage',
+    'warehouse': 'COMPUTE_WH',
+    'sl_env_var': '{"SL_ROOT": "/tmp/starlake"}',
+}
+
+cron = "0 0 * * *"
+
+statements = {
+    'sales.orders': {
+        'steps': '1',
+        'writeStrategy': 'WRITE_APPEND',
+        'schemaString': '"id" NUMBER(38,0), "amount" NUMBER(38,2)',
+        'createTable': ['CREATE TABLE IF NOT EXISTS sales.orders (id NUMBER(38,0), amount NUMBER(38,2))'],
+    },
+    'kpi.daily_orders': {
+        'mainSqlIfNotExists': [
+            "CREATE TABLE kpi.daily_orders AS SELECT COUNT(*) AS orders FROM sales.orders WHERE '{sl_start_date}' <= '{sl_end_date}'"
+        ],
+        'mainSqlIfExists': [
+            "INSERT INTO kpi.daily_orders SELECT COUNT(*) AS orders FROM sales.orders WHERE '{sl_start_date}' <= '{sl_end_date}'"
+        ],
+    },
+}
+
+expectation_items = {}
+
+audit = {}
+
+expectations = {}
+
+json_context = json.dumps({
+    'sales.orders': {
+        'tempStage': 'starlake_incoming',
+        'schema': {
+            'pattern': 'orders.*\\.csv',
+            'metadata': {
+                'format': 'DSV',
+                'separator': ',',
+                'withHeader': 'true',
+                'options': {'compression': 'false'},
+            },
+        },
+    }
+})
+
+def create_job():
+    return StarlakeSnowflakeJob(filename=os.path.basename(__file__), module_name=__name__, options=options)
+
+def load_pipeline():
+    sl_job = create_job()
+    schedule = StarlakeSchedule(
+        name='daily',
+        cron=cron,
+        domains=[StarlakeDomain(name='sales', final_name='sales', tables=[StarlakeTable(name='orders', final_name='orders')])],
+    )
+    with SnowflakeOrchestration(job=sl_job) as orchestration:
+        with orchestration.sl_create_pipeline(schedule=schedule) as pipeline:
+            start = pipeline.start_task()
+            load = pipeline.sl_load(task_id='sales_orders_load', domain='sales', table='orders')
+            end = pipeline.end_task()
+            start >> load >> end
+    return pipeline
+
+def transform_pipeline():
+    sl_job = create_job()
+    dependencies = StarlakeDependencies(dependencies=json.dumps([
+        {'data': {'name': 'kpi.daily_orders', 'typ': 'task', 'sink': 'kpi.daily_orders'}, 'children': []}
+    ]))
+    with SnowflakeOrchestration(job=sl_job) as orchestration:
+        with orchestration.sl_create_pipeline(dependencies=dependencies) as pipeline:
+            start = pipeline.start_task()
+            transform = pipeline.sl_transform(task_id='kpi_daily_orders_task', transform_name='kpi.daily_orders', params={'sink': 'kpi.daily_orders'}, cron_expr=cron)
+            end = pipeline.end_task()
+            start >> transform >> end
+    return pipeline
+
+def test_run_load_pipeline_locally():
+    session = LocalSession(
+        original_schedule=datetime(2024, 1, 2),
+        stage_files={
+            'starlake_incoming/sales/orders_1.csv': b'id,amount\n1,10.5\n2,20.0\n',
+            'starlake_incoming/sales/customers_1.csv': b'id,name\n1,john\n',
+        },
+    )
+    results = run_pipeline_locally(load_pipeline(), session)
+    assert results, "no task has been run"
+    for name, result in results.items():
+        assert result['error'] is None, f"{name} failed: {result['error']}"
+    load = [name for name in results if name.lower().endswith('sales_orders_load')]
+    assert load, f"the load task has not been run: {list(results)}"
+    statements_run = session.statements[load[0]]
+    assert any(statement.upper().startswith('COPY INTO') for statement in statements_run)
+    # only the files matching the pattern of the table have been loaded
+    assert session._connection.execute("SELECT id, amount FROM sales.orders ORDER BY id").fetchall() == [(1, 10.5), (2, 20.0)]
+
+def test_run_transform_pipeline_locally():
+    session = LocalSession(original_schedule=datetime(2024, 1, 2), strict=True)
+    session._attach('sales')
+    session._connection.execute("CREATE TABLE sales.orders (id NUMBER(38,0), amount NUMBER(38,2))")
+    session._connection.execute("INSERT INTO sales.orders VALUES (1, 10.5), (2, 20.0)")
+    pipeline = transform_pipeline()
+    # the table is created by the first run and the window is bound to the insert of the second one
+    for _ in range(2):
+        results = run_pipeline_locally(pipeline, session)
+        assert results, "no task has been run"
+        for name, result in results.items():
+            assert result['error'] is None, f"{name} failed: {result['error']}"
+    assert session._connection.execute("SELECT orders FROM kpi.daily_orders").fetchall() == [(2,), (2,)]